@@ -37,7 +37,7 @@ while nb_attempts < max_reconnections_authorized and not finished:
         device1.open()
         device2.open()
         # Capture des données sur les canaux disponibles
-        capture_with_timestamps(csv_file=csv_file, device1=device1, device2=device2, duration=duree_manip_en_secondes, with_sensor_data=True, logger=logger)
+        capture_with_timestamps(csv_file=csv_file, device1=device1, device2=device2, duration=duree_heure * 3600, with_sensor_data=True, logger=logger)
 
         finished=1
 
@@ -6,6 +6,7 @@ DEFAULT_WIDTH     = 180                                             # largeur me
 HOVER_WIDTH       = 240                                             # largeur menu au survol
 DEFAULT_FONT      = ("Arial", 11)                                   # style police menu par défaut
 HOVER_FONT        = ("Arial", 15)                                   # style police menu lors du hover
+EXPORT_DPI        = 150                                             # résolution export PNG
 
 ROLLING_WINDOW    = "10min"                                         # fenêtre moyenne/σ
 RESAMPLE_24H      = "10s"                                           # pas de rééchantillonage pour 24h
@@ -13,6 +14,10 @@ DEFAULT_CUTOFF_HZ = 0.1                                             # fréquence
 DEFAULT_V_SEC     = 480                                             # valeur « sécheresse » (capteur sol)
 DEFAULT_V_EAU     = 234                                             # valeur « eau »
 
+# Capteurs environnementaux lus en float32 (ADC 10‑16 bits : précision largement suffisante)
+SENSOR_COLUMNS = ("temp_degC", "humidity_air_percent", "soil_moisture",
+                  "light_intensity_baseline", "light_intensity_stressor")
+
 # Correspondance des courbes superposables (overlay) --------------------------
 OVERLAY_MAP = {
     "Température"         : ("temp_degC",               "Température (°C)"),
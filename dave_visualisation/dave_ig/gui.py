@@ -2,17 +2,18 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import sys
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from datetime import timedelta, datetime
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-from .config import DEFAULT_FONT, HOVER_FONT, HOVER_WIDTH, DEFAULT_WIDTH, OVERLAY_MAP
-from .signal_tools import lowpass_filter
-from .io_tools import load_csv, add_soil_humidity
+from .config import DEFAULT_FONT, HOVER_FONT, HOVER_WIDTH, DEFAULT_WIDTH, OVERLAY_MAP, EXPORT_DPI
+from .signal_tools import lowpass_filter_columns, resample_24h, fused_sub_trend
+from .io_tools import load_csv, add_soil_humidity, SignalData
 from .plot_voltage import plot_voltage, plot_voltage_24h, plot_voltage_mean24h, plot_voltage_mean_chan24h
 from .plot_sensor import plot_sensor_data, plot_sensor_data_24h, plot_sensor_data_mean24h
-from .overlay import add_trend_line, add_overlay_curve
-from .mpl_tools import new_figure, get_plot_titles
+from .overlay import add_trend_line, add_overlay_curve, update_overlay_curve, trend_line_mv, trend_24h_mv
+from .mpl_tools import new_figure, reset_figure, get_plot_titles
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Fenêtre principale Tkinter (menu, callbacks, canvas)
@@ -45,6 +46,9 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
 
+    # Densité réelle de l’écran : évite de rendre 150 dpi pour un écran à ~100
+    screen_dpi = root.winfo_fpixels("1i")
+
     # ── Menu latéral gauche ──────────────────────────────────────────────────
     frame_menu = tk.Frame(root, width=DEFAULT_WIDTH, bg="lightgray")
     frame_menu.pack(side=tk.LEFT, fill=tk.Y)
@@ -52,14 +56,26 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
 
     # Effet « hover » : agrandir/réduire le menu et ajuster la police
     widget_pool: list[tk.Widget] = []  # Tous les widgets du menu
+    font_widgets: list[tk.Widget] = []  # Sous-ensemble sensible à la police (rempli en fin de construction)
     FONT_AWARE = (tk.Label, tk.Button, tk.Entry, tk.Checkbutton, tk.Menubutton)
+    hover_state = {"target": False, "font": DEFAULT_FONT, "pending": None}
 
     def _set_hover(state: bool) -> None:
-        frame_menu.config(width=HOVER_WIDTH if state else DEFAULT_WIDTH)
-        font = HOVER_FONT if state else DEFAULT_FONT
-        for w in widget_pool:
-            if isinstance(w, FONT_AWARE):
-                w.configure(font=font)
+        # Regrouper les rafales <Enter>/<Leave> (passage sur les widgets enfants)
+        hover_state["target"] = state
+        if hover_state["pending"] is None:
+            hover_state["pending"] = root.after_idle(_apply_hover)
+
+    def _apply_hover() -> None:
+        hover_state["pending"] = None
+        font = HOVER_FONT if hover_state["target"] else DEFAULT_FONT
+        if font == hover_state["font"]:
+            return
+
+        hover_state["font"] = font
+        frame_menu.config(width=HOVER_WIDTH if hover_state["target"] else DEFAULT_WIDTH)
+        for w in font_widgets:
+            w.configure(font=font)
 
     frame_menu.bind("<Enter>", lambda _e: _set_hover(True))
     frame_menu.bind("<Leave>", lambda _e: _set_hover(False))
@@ -68,10 +84,24 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
     frame_plot = tk.Frame(root)
     frame_plot.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
 
+    # Figure et canvas uniques, vidés puis redessinés à chaque changement de vue
+    fig, _gs = new_figure("", None, dpi=screen_dpi)
+    canvas = FigureCanvasTkAgg(fig, master=frame_plot)
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
     # ─────────────────────────────────────────────────────────────────────────
     # États réactifs (mutable via closures)
     # ─────────────────────────────────────────────────────────────────────────
     df_filtered: pd.DataFrame = df.copy()
+    df_resampled: pd.DataFrame | None = None  # Cycle 24 h moyen (cache)
+    df_sub: pd.DataFrame = df_filtered  # Chan1‑3 − Chan4 (cache)
+    df_resampled_sub: pd.DataFrame | None = None  # Idem sur le cycle 24 h
+    trend: np.ndarray | None = None  # Tendance (mV) des canaux 1‑3
+    trend_sub: np.ndarray | None = None  # Tendance (mV) des canaux soustraits
+    trend_24h: pd.Series | None = None  # Cycle 24 h de la tendance (cache)
+    trend_24h_sub: pd.Series | None = None  # Idem, canaux soustraits
+    rolling_cache: dict = {}  # ±σ glissants (tableaux) de la génération courante
+    generation = 0  # Incrémentée à chaque recalcul des données dérivées
     v_sec: int = v_sec
     v_eau: int = v_eau
     cutoff: float | None = cutoff_hz
@@ -80,7 +110,7 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
     soustraction_active = {"enabled": False}  # Chan1‑3 − Chan4 ?
     sigma_visible = {"enabled": False}  # Afficher ±1 σ ?
     trend_visible = {"enabled": False}  # Courbe tendance ?
-    canvas_holder: dict[str, FigureCanvasTkAgg | None] = {"widget": None}
+    overlay_axes = {"choice": "None", "ax": None, "ax2": None}  # Courbe secondaire affichée
 
     # ─────────────────────────────────────────────────────────────────────────
     # Helpers « formulaire »
@@ -103,96 +133,129 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
 
         return x_min, x_max, cutoff_val, v_sec_val, v_eau_val
 
-    def apply_soustraction(df_src: pd.DataFrame) -> pd.DataFrame:
-        """Appliquer Chan4 en référence (Chan1‑3 -= Chan4) si l’option est active."""
+    def display_points() -> int | None:
+        """Nombre de points par courbe (2 × largeur figure en px) ou `None` si pleine résolution."""
+
+        if full_resolution.get():
+            return None
+        return 2 * int(fig.get_figwidth() * fig.dpi)
+
+    def build_soustraction(df_src: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+        """Construire Chan1‑3 − Chan4 et leur tendance (mV) en un seul noyau Numba."""
+
+        data = SignalData.from_frame(df_src)
+        buffers = np.empty((4, len(df_src)))
+        fused_sub_trend(data.chan1, data.chan2, data.chan3, data.chan4, *buffers)
+
+        # Copie superficielle : seules les 3 colonnes soustraites sont neuves
+        df_mod = df_src.copy(deep=False)
+        for i in range(3):
+            df_mod[f"chan{i + 1}_voltage_V"] = buffers[i]
+        return df_mod, buffers[3]
+
+    def refresh_caches() -> None:
+        """Recalculer les données dérivées de `df_filtered` (cycle 24 h, soustraction, tendances)."""
+
+        nonlocal df_resampled, df_sub, df_resampled_sub, trend, trend_sub, trend_24h, trend_24h_sub, generation
+
+        generation += 1
+        rolling_cache.clear()
+        df_resampled = resample_24h(df_filtered)
+        df_sub, trend_raw = build_soustraction(df_filtered)
+        df_resampled_sub, _ = build_soustraction(df_resampled)
+
+        # Tendance filtrée une fois par `cutoff`, avec ou sans soustraction, pour toutes les vues
+        trend = trend_line_mv(df_filtered, cutoff)
+        trend_sub = trend_line_mv(df_sub, cutoff, raw_mv=trend_raw)
+        trend_24h = trend_24h_mv(df_filtered, trend)
+        trend_24h_sub = trend_24h_mv(df_sub, trend_sub)
+
+    def apply_soustraction() -> tuple[pd.DataFrame, pd.DataFrame | None, np.ndarray | None, pd.Series | None]:
+        """Renvoyer (données, cycle 24 h, tendance mV, son cycle 24 h) avec Chan4 en référence si l’option est active."""
 
-        df_mod = df_src.copy()
         if soustraction_active["enabled"]:
-            for i in range(1, 4):
-                df_mod[f"chan{i}_voltage_V"] -= df_mod["chan4_voltage_V"]
-        return df_mod
+            return df_sub, df_resampled_sub, trend_sub, trend_24h_sub
+        return df_filtered, df_resampled, trend, trend_24h
+
+    def stats_key() -> tuple:
+        """Clé des ±σ en cache : génération des données, filtre et soustraction."""
+
+        return generation, cutoff, soustraction_active["enabled"]
+
+    def track_overlay(ax, ax2) -> None:
+        """Mémoriser les axes de la vue courante pour les changements d’overlay."""
+
+        overlay_axes.update(choice=overlay_var.get(), ax=ax, ax2=ax2)
 
     # ─────────────────────────────────────────────────────────────────────────
     # Fonctions de dessin (une par vue)
     # ─────────────────────────────────────────────────────────────────────────
-    def draw_classic_plot(df_src: pd.DataFrame, parent):
-        df_mod = apply_soustraction(df_src)
+    def draw_classic_plot() -> None:
+        df_mod, _, trend_mv, _ = apply_soustraction()
         ttl_left, ttl_center = get_plot_titles(df_mod.index.min(), df_mod.index.max(), "classic")
-        fig, gs = new_figure(ttl_center, ttl_left)
+        gs = reset_figure(fig, ttl_center, ttl_left)
         ax = plot_voltage(df_mod, gs, fig, df_mod.index.min(), df_mod.index.max(), cutoff_hz=cutoff,
-                          show_sigma=sigma_visible["enabled"])
+                          show_sigma=sigma_visible["enabled"], max_points=display_points(),
+                          stats_cache=rolling_cache, stats_key=stats_key())
 
         if trend_visible["enabled"]:
-            add_trend_line(ax, df_mod, "classic", cutoff)
+            add_trend_line(ax, df_mod, "classic", cutoff, trend_mv=trend_mv)
 
-        add_overlay_curve(ax, df_mod, overlay_var, "classic")
+        track_overlay(ax, add_overlay_curve(ax, df_mod, overlay_var, "classic"))
         ax.legend(fontsize=8, framealpha=0.9)
 
-        plot_sensor_data(df_mod, gs, ax, fig, df_mod.index.min(), df_mod.index.max(), v_sec, v_eau)
+        plot_sensor_data(df_mod, gs, ax, fig, df_mod.index.min(), df_mod.index.max(), v_sec, v_eau,
+                         max_points=display_points())
 
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw();
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        return canvas
+        canvas.draw_idle()
 
-    def draw_daily_plot(df_src: pd.DataFrame, parent):
-        df_mod = apply_soustraction(df_src)
+    def draw_daily_plot() -> None:
+        df_mod, _, trend_mv, _ = apply_soustraction()
         ttl_left, ttl_center = get_plot_titles(df_mod.index.min(), df_mod.index.max(), "24h")
-        fig, gs = new_figure(ttl_center, ttl_left)
-        ax = plot_voltage_24h(df_mod, gs, fig, show_sigma=sigma_visible["enabled"])
+        gs = reset_figure(fig, ttl_center, ttl_left)
+        ax = plot_voltage_24h(df_mod, gs, fig, show_sigma=sigma_visible["enabled"], max_points=display_points(),
+                              stats_cache=rolling_cache, stats_key=stats_key())
 
         if trend_visible["enabled"]:
-            add_trend_line(ax, df_mod, "24h", cutoff)
+            add_trend_line(ax, df_mod, "24h", cutoff, trend_mv=trend_mv)
 
-        add_overlay_curve(ax, df_mod, overlay_var, "24h")
-        plot_sensor_data_24h(df_mod, gs, ax, fig)
+        track_overlay(ax, add_overlay_curve(ax, df_mod, overlay_var, "24h"))
+        plot_sensor_data_24h(df_mod, gs, ax, fig, max_points=display_points())
 
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw();
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        return canvas
+        canvas.draw_idle()
 
-    def draw_mean24h_plot(df_src: pd.DataFrame, parent):
-        df_mod = apply_soustraction(df_src)
+    def draw_mean24h_plot() -> None:
+        df_mod, df_res, _, trend_res = apply_soustraction()
         ttl_left, ttl_center = get_plot_titles(df_mod.index.min(), df_mod.index.max(), "mean24h")
-        fig, gs = new_figure(ttl_center, ttl_left)
-        ax = plot_voltage_mean24h(df_mod, gs, fig, show_sigma=sigma_visible["enabled"])
+        gs = reset_figure(fig, ttl_center, ttl_left)
+        ax = plot_voltage_mean24h(df_mod, gs, fig, show_sigma=sigma_visible["enabled"], df_resampled=df_res)
 
         if trend_visible["enabled"]:
-            add_trend_line(ax, df_mod, "mean24h", cutoff)
+            add_trend_line(ax, df_mod, "mean24h", cutoff, trend_24h=trend_res)
 
-        add_overlay_curve(ax, df_mod, overlay_var, "mean24h")
-        plot_sensor_data_mean24h(df_mod, gs, ax, fig, v_sec, v_eau)
+        track_overlay(ax, add_overlay_curve(ax, df_mod, overlay_var, "mean24h", df_resampled=df_res))
+        plot_sensor_data_mean24h(df_mod, gs, ax, fig, v_sec, v_eau, df_resampled=df_res)
 
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw();
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        return canvas
+        canvas.draw_idle()
 
-    def draw_supermean_plot(df_src: pd.DataFrame, parent):
-        df_mod = apply_soustraction(df_src)
+    def draw_supermean_plot() -> None:
+        df_mod, df_res, _, _ = apply_soustraction()
         ttl_left, ttl_center = get_plot_titles(df_mod.index.min(), df_mod.index.max(), "supermean24h")
-        fig, gs = new_figure(ttl_center, ttl_left)
-        ax = plot_voltage_mean_chan24h(df_mod, gs, fig, show_sigma=sigma_visible["enabled"])
-        add_overlay_curve(ax, df_mod, overlay_var, "supermean24h")
-        plot_sensor_data_mean24h(df_mod, gs, ax, fig, v_sec, v_eau)
+        gs = reset_figure(fig, ttl_center, ttl_left)
+        ax = plot_voltage_mean_chan24h(df_mod, gs, fig, show_sigma=sigma_visible["enabled"], df_resampled=df_res)
+        track_overlay(ax, add_overlay_curve(ax, df_mod, overlay_var, "supermean24h", df_resampled=df_res))
+        plot_sensor_data_mean24h(df_mod, gs, ax, fig, v_sec, v_eau, df_resampled=df_res)
 
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw();
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        return canvas
+        canvas.draw_idle()
 
     # ─────────────────────────────────────────────────────────────────────────
     # Rafraîchir l’affichage
     # ─────────────────────────────────────────────────────────────────────────
     def update_plot(view_mode: str = "classic") -> None:
-        """Déposer la bonne vue sur `frame_plot` après avoir détruit l’ancienne."""
+        """Redessiner la bonne vue dans la figure persistante de `frame_plot`."""
 
         current_mode[0] = view_mode
 
-        if canvas_holder["widget"]:
-            canvas_holder["widget"].get_tk_widget().destroy()
-
         drawer = {
             "classic": draw_classic_plot,
             "24h": draw_daily_plot,
@@ -200,13 +263,29 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
             "supermean24h": draw_supermean_plot,
         }[view_mode]
 
-        canvas_holder["widget"] = drawer(df_filtered, frame_plot)
+        drawer()
+
+    def on_overlay_change(choice: str) -> None:
+        """Mettre à jour la seule courbe secondaire ; reconstruire la vue si l’axe droit apparaît/disparaît."""
+
+        if choice == overlay_axes["choice"]:
+            return
+
+        if overlay_axes["ax2"] is None or choice == "None":
+            update_plot(current_mode[0])
+            return
+
+        df_mod, df_res, _, _ = apply_soustraction()
+        update_overlay_curve(overlay_axes["ax"], overlay_axes["ax2"], df_mod, choice, current_mode[0],
+                             df_resampled=df_res)
+        overlay_axes["choice"] = choice
+        canvas.draw_idle()
 
     # ─────────────────────────────────────────────────────────────────────────
     # Actualiser les données (lecture formulaire) puis redessiner
     # ─────────────────────────────────────────────────────────────────────────
-    def update_data_and_plot() -> None:
-        """Filtrer le DataFrame selon les champs puis rafraîchir la vue courante."""
+    def update_data_and_plot() -> bool:
+        """Filtrer le DataFrame selon les champs puis rafraîchir la vue ; `False` si saisie invalide."""
 
         nonlocal df_filtered, v_sec, v_eau, cutoff
 
@@ -214,7 +293,7 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
             x_min, x_max, cutoff_hz_val, v_sec_val, v_eau_val = parse_form_values()
 
         except ValueError:
-            return
+            return False
 
         df_sel = df[(df.index >= x_min) & (df.index <= x_max)].copy()
 
@@ -232,14 +311,26 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
 
         # Filtre Butterworth éventuellement
         if cutoff_hz_val is not None:
-            for col in ["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V", "chan4_voltage_V"]:
-                df_sel[col] = lowpass_filter(df_sel[col], cutoff_hz_val)
+            cols = ["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V", "chan4_voltage_V"]
+            df_sel[cols] = lowpass_filter_columns(df_sel, cols, cutoff_hz_val)
 
         add_soil_humidity(df_sel, v_sec_val, v_eau_val)
 
         df_filtered = df_sel
         v_sec, v_eau, cutoff = v_sec_val, v_eau_val, cutoff_hz_val
+        refresh_caches()
         update_plot(current_mode[0])
+        return True
+
+    def export_png() -> None:
+        """Enregistrer la figure courante en PNG haute résolution (``EXPORT_DPI``)."""
+
+        out_path = filedialog.asksaveasfilename(title="Exporter la figure", defaultextension=".png",
+                                                filetypes=[("PNG", "*.png")])
+        if not out_path:
+            return
+
+        fig.savefig(out_path, dpi=EXPORT_DPI)
 
     # ─────────────────────────────────────────────────────────────────────────
     # Toggles visuels
@@ -296,8 +387,10 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
         str_d0.set(df.index.min().strftime("%d/%m/%Y"))
         str_d1.set(df.index.max().strftime("%d/%m/%Y"))
 
-        add_soil_humidity(df_filtered, v_sec, v_eau)
-        update_data_and_plot()
+        # Données dérivées calculées une seule fois : par `update_data_and_plot`, sinon ici
+        if not update_data_and_plot():
+            add_soil_humidity(df_filtered, v_sec, v_eau)
+            refresh_caches()
 
     # champs ──────────────────────────────────────────────────────────────────
     str_d0 = tk.StringVar(value=start_date.strftime("%d/%m/%Y"))
@@ -323,6 +416,10 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
     btn_load_csv.pack(padx=10, pady=6, fill=tk.X)
     widget_pool.append(btn_load_csv)
 
+    btn_export = tk.Button(frame_menu, text="Exporter PNG", command=export_png, font=DEFAULT_FONT)
+    btn_export.pack(padx=10, pady=6, fill=tk.X)
+    widget_pool.append(btn_export)
+
     # Section « Affichage » ───────────────────────────────────────────────────
     add_sep_label("────── Affichage ──────")
     for lbl, mode in [("Affichage classique", "classic"),
@@ -347,9 +444,15 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
     btn_trend.pack(padx=10, pady=6, fill=tk.X)
     widget_pool.append(btn_trend)
 
+    full_resolution = tk.BooleanVar(value=False)
+    chk_full_res = tk.Checkbutton(frame_menu, text="Pleine résolution", variable=full_resolution, bg="lightgray",
+                                  font=DEFAULT_FONT, command=lambda: update_plot(current_mode[0]))
+    chk_full_res.pack(padx=6, pady=4)
+    widget_pool.append(chk_full_res)
+
     overlay_var = tk.StringVar(value="None")
     overlay_list = ["None"] + list(OVERLAY_MAP.keys())
-    opt_overlay = tk.OptionMenu(frame_menu, overlay_var, *overlay_list, command=lambda *_: update_plot(current_mode[0]))
+    opt_overlay = tk.OptionMenu(frame_menu, overlay_var, *overlay_list, command=on_overlay_change)
     opt_overlay.config(font=DEFAULT_FONT, width=18)
     opt_overlay.pack(padx=10, pady=6, fill=tk.X)
     widget_pool.append(opt_overlay)
@@ -371,6 +474,8 @@ def start_gui(df: pd.DataFrame, *, csv_path: str, v_sec: int, v_eau: int,
     btn_apply.pack(padx=10, pady=10, fill=tk.X)
     widget_pool.append(btn_apply)
 
+    font_widgets.extend(w for w in widget_pool if isinstance(w, FONT_AWARE))
+
     # ─────────────────────────────────────────────────────────────────────────
     # Premier tracé puis boucle Tk
     # ─────────────────────────────────────────────────────────────────────────
@@ -1,7 +1,48 @@
+from dataclasses import dataclass
+import numpy as np
 import pandas as pd
 from pandas.errors import ParserError
 from pathlib import Path
 
+from .config import SENSOR_COLUMNS
+
+# Colonnes capteurs converties en float32 dès le parseur CSV (les canaux de tension restent en float64)
+_SENSOR_DTYPES = {col: np.float32 for col in SENSOR_COLUMNS}
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Vue « structure de tableaux » des colonnes numériques
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass
+class SignalData:
+    """
+    Tableaux NumPy typés (un par canal/capteur) partagés avec un `DataFrame`.
+
+    Les attributs sont des vues sans copie des colonnes : les calculs des
+    chemins chauds (soustraction, tendance) s’y font avec ``out=`` au lieu de
+    copier puis réaffecter des colonnes Pandas.
+    """
+
+    index: pd.DatetimeIndex
+    chan1: np.ndarray
+    chan2: np.ndarray
+    chan3: np.ndarray
+    chan4: np.ndarray
+    soil_moisture: np.ndarray
+    humidity_soil_percent: np.ndarray | None
+    temperature: np.ndarray
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SignalData":
+        """Construire la vue SoA d’un `DataFrame` issu de `load_csv`."""
+
+        col = lambda name: df[name].to_numpy(copy=False)
+        return cls(index=df.index,
+                   chan1=col("chan1_voltage_V"), chan2=col("chan2_voltage_V"),
+                   chan3=col("chan3_voltage_V"), chan4=col("chan4_voltage_V"),
+                   soil_moisture=col("soil_moisture"),
+                   humidity_soil_percent=col("humidity_soil_percent") if "humidity_soil_percent" in df else None,
+                   temperature=col("temp_degC"))
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Utilitaires I/O
 # ─────────────────────────────────────────────────────────────────────────────
@@ -25,23 +66,25 @@ def load_csv(path: str | Path) -> pd.DataFrame:
         1. Colonne explicite « timestamp » (`parse_dates=['timestamp']`).
         2. Première colonne = index date (`index_col=0`, `parse_dates=True`).
         3. Lecture brute puis conversion manuelle.
+
+    Les colonnes ``SENSOR_COLUMNS`` sont lues directement en float32.
     """
 
     # ── 1. Colonne 'timestamp' explicite ────────────────────────────────────
     try:
-        return pd.read_csv(path, parse_dates=["timestamp"], index_col="timestamp").dropna()
+        return pd.read_csv(path, parse_dates=["timestamp"], index_col="timestamp", dtype=_SENSOR_DTYPES).dropna()
     except (ParserError, ValueError, KeyError):
         pass
 
     # ── 2. Première colonne = index ─────────────────────────────────────────
     try:
-        return pd.read_csv(path, index_col=0, parse_dates=True).dropna()
+        return pd.read_csv(path, index_col=0, parse_dates=True, dtype=_SENSOR_DTYPES).dropna()
     except (ParserError, ValueError):
         pass
 
     # ── 3. Fallback : lecture brute + conversion ────────────────────────────
     try:
-        df = pd.read_csv(path)
+        df = pd.read_csv(path, dtype=_SENSOR_DTYPES)
         df["timestamp"] = pd.to_datetime(df["timestamp"])
         df.set_index("timestamp", inplace=True)
         df.dropna(inplace=True)
@@ -70,5 +113,35 @@ def add_soil_humidity(df: pd.DataFrame, v_sec: int, v_eau: int) -> pd.DataFrame:
     #  - 0 % si soil_moisture == v_sec  (sol sec)
     #  - 100 % si soil_moisture == v_eau (sol saturé)
     # Interpolation linéaire entre ces deux bornes.
-    df["humidity_soil_percent"] = ((v_sec - df["soil_moisture"]) / (v_sec - v_eau) * 100)
-    return df
\ No newline at end of file
+    # NumExpr fusionne soustraction, division et produit en une seule passe ;
+    # constantes au type de la colonne pour garder le float32 du chargement.
+    as_col = df["soil_moisture"].dtype.type
+    v_sec, v_eau, pct = as_col(v_sec), as_col(v_eau), as_col(100)
+    df.eval("humidity_soil_percent = (@v_sec - soil_moisture) / (@v_sec - @v_eau) * @pct",
+            engine="numexpr", inplace=True)
+    return df
+
+def ensure_humidity_soil_percent(df: pd.DataFrame, v_sec: int, v_eau: int) -> pd.DataFrame:
+    """
+    Ajouter « humidity_soil_percent » seulement si la colonne est absente.
+
+    Paramètres :
+        - df : pandas.DataFrame
+            Données contenant ``soil_moisture`` (modifiées en place si besoin).
+        - v_sec / v_eau : int
+            Calibrage, transmis à `add_soil_humidity`.
+
+    Retour :
+        - pandas.DataFrame
+            Le même objet, pour chaînage éventuel.
+
+    Notes :
+        Les tracés l’appellent sur des données déjà préparées par
+        `add_soil_humidity` au chargement : la conversion n’est alors
+        pas refaite à chaque figure. Après un changement de calibrage,
+        appeler directement `add_soil_humidity`.
+    """
+
+    if "humidity_soil_percent" in df.columns:
+        return df
+    return add_soil_humidity(df, v_sec, v_eau)
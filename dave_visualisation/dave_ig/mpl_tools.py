@@ -1,12 +1,25 @@
+from functools import lru_cache
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import matplotlib.gridspec as gridspec
+from matplotlib.collections import LineCollection
+import numpy as np
 import pandas as pd
 
+from .config import EXPORT_DPI
+
+# Libellés des vues (titre gauche)
+MODE_NAMES = {
+    "classic":       "Affichage classique",
+    "24h":           "Affichage 24 h",
+    "mean24h":       "Moyenne 24 h",
+    "supermean24h":  "Moyenne canaux 24 h",
+}
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Helpers Matplotlib (figures et axes)
 # ─────────────────────────────────────────────────────────────────────────────
-def new_figure(title_center: str, title_left: str | None = None):
+def new_figure(title_center: str, title_left: str | None = None, *, dpi: float | None = None):
     """
     Créer une figure 3 × 2 avec `constrained_layout`.
 
@@ -15,13 +28,36 @@ def new_figure(title_center: str, title_left: str | None = None):
             Titre principal (centré).
         - title_left : str | None
             Sous‑titre aligné à gauche (optionnel).
+        - dpi : float | None
+            Densité d’affichage de l’écran ; `None` = ``EXPORT_DPI``.
 
     Retour :
         - tuple(matplotlib.figure.Figure, matplotlib.gridspec.GridSpec)
     """
 
-    # Création de la figure et ajout du titre principal (centré)
-    fig = plt.figure(figsize=(12, 8), dpi=150, constrained_layout=True)
+    # Création de la figure puis titres et grille
+    fig = plt.figure(figsize=(12, 8), dpi=dpi or EXPORT_DPI, constrained_layout=True)
+    gs = reset_figure(fig, title_center, title_left)
+    return fig, gs
+
+def reset_figure(fig, title_center: str, title_left: str | None = None):
+    """
+    Vider une figure existante et y replacer titres et grille 3 × 2.
+
+    Paramètres :
+        - fig : matplotlib.figure.Figure
+            Figure persistante à réutiliser (évite d’en recréer une par tracé).
+        - title_center / title_left : str, str | None
+            Titres identiques à `new_figure`.
+
+    Retour :
+        - matplotlib.gridspec.GridSpec
+    """
+
+    # Suppression des axes, textes et légendes du tracé précédent
+    fig.clf()
+
+    # Ajout du titre principal (centré)
     fig.suptitle(title_center, fontsize=16, ha="center")
 
     # Ajout du second titre (à gauche)
@@ -30,10 +66,10 @@ def new_figure(title_center: str, title_left: str | None = None):
                  va="top", ha="left", weight="bold")
 
     # Sépartion de la figure en 3 lignes et 2 colonnes
-    gs = gridspec.GridSpec(3, 2, figure=fig, width_ratios=[0.5, 0.5])
-    return fig, gs
+    return gridspec.GridSpec(3, 2, figure=fig, width_ratios=[0.5, 0.5])
 
-def format_axes(ax, *, xlabel: str = "", ylabel: str = "", xmin=None, xmax=None) -> None:
+def format_axes(ax, *, xlabel: str = "", ylabel: str = "", xmin=None, xmax=None,
+                skip_xaxis: bool = False) -> None:
     """
     Mettre en forme un axe : grille, labels et dates.
 
@@ -44,6 +80,10 @@ def format_axes(ax, *, xlabel: str = "", ylabel: str = "", xmin=None, xmax=None)
             Libellés d’axes (vides par défaut).
         - xmin / xmax : pandas.Timestamp | float | None
             Limites X facultatives.
+        - skip_xaxis : bool
+            Axe créé avec ``sharex`` sur un axe déjà mis en forme : limites,
+            locator et formatter sont partagés, seuls labels, grille et
+            rotation des dates sont appliqués.
     """
 
     # Ajout label en X si != ""
@@ -56,6 +96,12 @@ def format_axes(ax, *, xlabel: str = "", ylabel: str = "", xmin=None, xmax=None)
 
     # Ajout cradillage en pointillé
     ax.grid(True, linestyle="--", alpha=0.6)
+
+    # Axe X partagé : le premier tick sert de modèle aux suivants (pas de calcul des dates ici)
+    if skip_xaxis:
+        plt.setp(ax.xaxis.get_major_ticks(1)[0].label1, rotation=45, ha="right")
+        return
+
     ax.margins(x=0)
 
     # Si une plage est spécifiée → fixer les bornes de l’axe X
@@ -67,7 +113,107 @@ def format_axes(ax, *, xlabel: str = "", ylabel: str = "", xmin=None, xmax=None)
     ax.xaxis.set_major_locator(mdates.AutoDateLocator())
     plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha="right")
 
-def draw_sigma(ax, mean: pd.Series, std: pd.Series, *, color: str) -> None:
+def decimate_for_display(series: pd.Series, target_points: int) -> pd.Series:
+    """
+    Réduire une série à son enveloppe min/max sur `target_points` colonnes.
+
+    Paramètres :
+        - series : pandas.Series
+            Série indexée en temps (éventuellement avec des NaN).
+        - target_points : int
+            Nombre de seaux (≈ colonnes de pixels) ; au plus 2 points par seau.
+
+    Retour :
+        - pandas.Series
+            Sous‑ensemble de `series`, dans l’ordre chronologique.
+
+    Notes :
+    La série est découpée par `reshape` en seaux contigus ; on garde, dans
+    chacun, l’échantillon minimal et l’échantillon maximal. L’enveloppe
+    visible (pics compris) est identique à celle du tracé complet.
+    """
+
+    n = len(series)
+    if n <= 2 * target_points:
+        return series
+
+    size = -(-n // target_points)       # Taille d’un seau (arrondi supérieur)
+    n_buckets = -(-n // size)
+    y = np.full(n_buckets * size, np.nan)
+    y[:n] = series.to_numpy(dtype=np.float64)
+    y = y.reshape(n_buckets, size)
+    nan = np.isnan(y)
+
+    # Les NaN (et le remplissage du dernier seau) ne sont jamais retenus
+    offsets = np.arange(n_buckets) * size
+    i_min = offsets + np.where(nan, np.inf, y).argmin(axis=1)
+    i_max = offsets + np.where(nan, -np.inf, y).argmax(axis=1)
+
+    keep = np.unique(np.concatenate([i_min, i_max, [0, n - 1]]))
+    return series.iloc[keep[keep < n]]
+
+def plot_decimated(ax, series: pd.Series, n_out: int | None = 4000, **kwargs):
+    """
+    Tracer une série en la réduisant à ~`n_out` points (enveloppe min/max) si elle est plus longue.
+
+    Paramètres :
+        - ax : matplotlib.axes.Axes
+            Axe cible.
+        - series : pandas.Series
+            Série indexée en temps.
+        - n_out : int | None
+            Nombre de points conservés ; `None` = pleine résolution.
+        - kwargs : options transmises à `ax.plot`.
+
+    Retour :
+        - list(matplotlib.lines.Line2D), comme `ax.plot`.
+    """
+
+    return ax.plot(_decimate(series, n_out), **kwargs)
+
+def plot_lines(ax, series_list: list[pd.Series], colors: list, n_out: int | None = 4000,
+               **kwargs) -> LineCollection:
+    """
+    Tracer plusieurs séries temporelles d’un coup, dans une seule `LineCollection`.
+
+    Paramètres :
+        - ax : matplotlib.axes.Axes
+            Axe cible (axe X en dates).
+        - series_list : list(pandas.Series)
+            Une série par courbe (ex. une par journée).
+        - colors : list
+            Une couleur par série.
+        - n_out : int | None
+            Réduction min/max par série ; `None` = pleine résolution.
+        - kwargs : options transmises à `LineCollection` (linewidths, alpha, …).
+
+    Retour :
+        - matplotlib.collections.LineCollection
+
+    Notes :
+    Un seul artiste et une seule mise à l’échelle au lieu d’un `Line2D`
+    (et d’un `autoscale_view`) par série.
+    """
+
+    segments = []
+    for series in series_list:
+        series = _decimate(series, n_out)
+        segments.append(np.column_stack([mdates.date2num(series.index), series.to_numpy(dtype=np.float64)]))
+
+    lc = LineCollection(segments, colors=colors, **kwargs)
+    ax.xaxis_date()
+    ax.add_collection(lc)
+    ax.autoscale_view()
+    return lc
+
+def _decimate(series: pd.Series, n_out: int | None) -> pd.Series:
+    """Enveloppe min/max de `series` sur `n_out` points (inchangée si `n_out` est `None`)."""
+
+    if n_out is None or n_out < 2:
+        return series
+    return decimate_for_display(series, n_out // 2)
+
+def draw_sigma(ax, mean: pd.Series, std: pd.Series, *, color: str, max_points: int | None = None) -> None:
     """
     Tracer ±1σ autour d’une moyenne glissante, en pointillé.
 
@@ -78,11 +224,45 @@ def draw_sigma(ax, mean: pd.Series, std: pd.Series, *, color: str) -> None:
             Moyenne et écart‑type glissants (index identiques).
         - color : str
             Couleur de la courbe principale, réutilisée en pointillé.
+        - max_points : int | None
+            Réduction min/max avant tracé (`plot_decimated`) ; `None` = tout tracer.
     """
 
-    ax.plot(mean + std, color=color, linestyle=":", linewidth=1)
-    ax.plot(mean - std, color=color, linestyle=":", linewidth=1)
+    # Bande sous le pixel aux limites Y actuelles : rien de visible à tracer
+    if sigma_band_px(ax, std) < 1.0:
+        return
+
+    plot_decimated(ax, mean + std, max_points, color=color, linestyle=":", linewidth=1)
+    plot_decimated(ax, mean - std, max_points, color=color, linestyle=":", linewidth=1)
+
+def sigma_band_px(ax, std) -> float:
+    """Demi‑largeur (px) de la bande ±σ la plus large, aux limites Y actuelles de `ax`."""
+
+    y0, y1 = ax.get_ylim()
+    if y1 == y0:
+        return 0.0
+    return float(np.nanmax(std, initial=0.0)) * ax.get_window_extent().height / abs(y1 - y0)
 
+def sigma_resolvable(ax, series: pd.Series, *, stride: int = 100) -> bool:
+    """
+    Estimer, avant tout calcul glissant, si la bande ±σ de `series` dépasserait 1 px.
+
+    Notes :
+    σ grossier sur 1 échantillon sur `stride` (1 %), rapporté à l’étendue de
+    la série et à la hauteur de l’axe. Dérive comprise, ce σ majore en pratique
+    le σ glissant : une série jugée invisible ici l’est aussi en glissant.
+    """
+
+    sample = series.to_numpy()[::stride]
+    if len(sample) < 2:
+        return True
+
+    span = np.nanmax(sample) - np.nanmin(sample)
+    if not span > 0:
+        return False        # Série constante (ou uniquement NaN)
+    return np.nanstd(sample) * ax.get_window_extent().height / span >= 1.0
+
+@lru_cache(maxsize=8)
 def get_plot_titles(x_min: pd.Timestamp, x_max: pd.Timestamp, mode: str) -> tuple[str, str]:
     """
     Générer les deux titres d’un graphique selon le mode d’affichage.
@@ -96,15 +276,13 @@ def get_plot_titles(x_min: pd.Timestamp, x_max: pd.Timestamp, mode: str) -> tupl
     Retour :
         - tuple(str, str)
             (titre_gauche, titre_centré).
+
+    Notes :
+    Résultat mis en cache (lru_cache) : les bascules d’options redessinent
+    la même vue avec les mêmes bornes.
     """
 
-    mode_names = {
-        "classic":       "Affichage classique",
-        "24h":           "Affichage 24 h",
-        "mean24h":       "Moyenne 24 h",
-        "supermean24h":  "Moyenne canaux 24 h",
-    }
-    title_left = mode_names.get(mode, mode)
+    title_left = MODE_NAMES.get(mode, mode)
 
     # -------------------- Durée lisible , par ex : « 3 jours 4h 30min » --------------------
     duration = x_max - x_min
@@ -1,12 +1,15 @@
+import numpy as np
 import pandas as pd
 
-from .signal_tools import lowpass_filter
-from .config import BASE_DATE, RESAMPLE_24H, OVERLAY_MAP
+from .signal_tools import lowpass_filter, resample_24h
+from .io_tools import SignalData
+from .config import BASE_DATE, OVERLAY_MAP
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Courbes additionnelles (tendance / overlay)
 # ─────────────────────────────────────────────────────────────────────────────
-def add_trend_line(ax, df_src: pd.DataFrame, mode: str, cutoff_hz: float | None) -> None:
+def add_trend_line(ax, df_src: pd.DataFrame, mode: str, cutoff_hz: float | None,
+                   *, trend_mv: np.ndarray | None = None, trend_24h: pd.Series | None = None) -> None:
     """
     Ajouter la courbe « Tendance » (moyenne des canaux 1‑3).
 
@@ -19,34 +22,82 @@ def add_trend_line(ax, df_src: pd.DataFrame, mode: str, cutoff_hz: float | None)
             Identifiant de la vue courante (« classic », « 24h », …).
         - cutoff_hz : float | None
             Fréquence de coupure appliquée ou `None`.
+        - trend_mv : numpy.ndarray | None
+            Tendance déjà calculée sur `df_src` (`trend_line_mv`, même
+            `cutoff_hz`) ; `None` = calculée ici.
+        - trend_24h : pandas.Series | None
+            Cycle 24 h de la tendance déjà calculé (`trend_24h_mv`), réutilisé
+            en « mean24h » ; `None` = calculé ici.
+
+    Notes :
+    Une seule définition dans toutes les vues : `trend_line_mv` sur `df_src`,
+    réalignée (« 24h ») ou moyennée par ``RESAMPLE_24H`` (« mean24h »).
     """
 
-    if mode == "supermean24h":      # Pas pertinent dans cette vue
+    if mode not in {"classic", "24h", "mean24h"}:      # « supermean24h » : pas pertinent
         return
 
-    chans = ["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V"]
-    df_work = df_src.copy()
+    if mode == "mean24h" and trend_24h is not None:
+        _plot_trend(ax, trend_24h.to_numpy(), trend_24h.index)
+        return
 
-    # Filtrer chaque canal si un cutoff est appliqué
-    if cutoff_hz is not None:
-        for c in chans:
-            df_work[c] = lowpass_filter(df_work[c], cutoff_hz)
+    if trend_mv is None:
+        trend_mv = trend_line_mv(df_src, cutoff_hz)
 
-    # Construction de la série « trend » selon le mode ────────────────────────
+    idx = df_src.index
     if mode == "classic":
-        trend = df_work[chans].mean(axis=1) * 1000
-    elif mode in {"24h", "mean24h"}:
-        df_tmp = df_work.copy()
-        df_tmp.index = BASE_DATE + (df_tmp.index - df_tmp.index.normalize())
-        if mode != "24h":
-            df_tmp = df_tmp.resample(RESAMPLE_24H).mean()
-        trend = df_tmp[chans].mean(axis=1) * 1000
-    else:  # mode inattendu → rien à faire
-        return
+        _plot_trend(ax, trend_mv, idx)
+    elif mode == "24h":
+        _plot_trend(ax, trend_mv, BASE_DATE + (idx - idx.normalize()))
+    else:
+        trend_24h = trend_24h_mv(df_src, trend_mv)
+        _plot_trend(ax, trend_24h.to_numpy(), trend_24h.index)
+
+def trend_24h_mv(df_src: pd.DataFrame, trend_mv: np.ndarray) -> pd.Series:
+    """Moyenner la tendance de `df_src` par ``RESAMPLE_24H`` (même grille que `resample_24h(df_src)`)."""
+
+    return resample_24h(pd.DataFrame({"trend": trend_mv}, index=df_src.index))["trend"]
+
+def trend_line_mv(df_src: pd.DataFrame, cutoff_hz: float | None, *, raw_mv: np.ndarray | None = None) -> np.ndarray:
+    """
+    Calculer la tendance (mV) : moyenne des canaux 1‑3, filtrée par `cutoff_hz`.
 
-    ax.plot(trend, color="#999999", alpha=0.4, linewidth=0.8, label="Tendance")
+    Paramètres :
+        - df_src : pandas.DataFrame
+            Données déjà filtrées/alignées.
+        - cutoff_hz : float | None
+            Fréquence de coupure ou `None` (pas de filtrage).
+        - raw_mv : numpy.ndarray | None
+            Moyenne non filtrée déjà connue (`fused_sub_trend`) ; `None` = calculée.
 
-def add_overlay_curve(ax, df_src: pd.DataFrame, overlay_var, mode: str) -> None:
+    Notes :
+    Le filtre est linéaire : filtrer la moyenne équivaut à moyenner les canaux
+    filtrés, pour un seul passage `sosfiltfilt` au lieu de trois.
+    """
+
+    trend = _trend_mv(df_src) if raw_mv is None else raw_mv
+    if cutoff_hz is None:
+        return trend
+    return lowpass_filter(pd.Series(trend, index=df_src.index), cutoff_hz).to_numpy()
+
+def _trend_mv(df_tmp: pd.DataFrame) -> np.ndarray:
+    """Calculer la moyenne des canaux 1‑3 en mV."""
+
+    # Une seule allocation, opérations en place
+    data = SignalData.from_frame(df_tmp)
+    trend = np.empty_like(data.chan1, dtype=float)
+    np.add(data.chan1, data.chan2, out=trend)
+    trend += data.chan3
+    trend *= 1000.0 / 3.0
+    return trend
+
+def _plot_trend(ax, trend: np.ndarray, index: pd.DatetimeIndex) -> None:
+    """Tracer la tendance (mV) en gris discret."""
+
+    ax.plot(pd.Series(trend, index=index), color="#999999", alpha=0.4, linewidth=0.8, label="Tendance")
+
+def add_overlay_curve(ax, df_src: pd.DataFrame, overlay_var, mode: str,
+                      *, df_resampled: pd.DataFrame | None = None):
     """
     Superposer une courbe secondaire (température, humidité, etc.) sur l’axe droit.
 
@@ -59,31 +110,75 @@ def add_overlay_curve(ax, df_src: pd.DataFrame, overlay_var, mode: str) -> None:
             Choix utilisateur (« Température », « Humidité sol », …).
         - mode : str
             Vue courante, pour savoir s’il faut ré‑aligner sur 24 h.
+        - df_resampled : pandas.DataFrame | None
+            Cycle 24 h moyen déjà calculé (`resample_24h`), réutilisé si fourni.
+
+    Retour :
+        - matplotlib.axes.Axes | None
+            Axe droit créé (à conserver pour `update_overlay_curve`), ou `None`.
     """
 
     choice = overlay_var.get()
     if choice == "None":
-        return
+        return None
 
-    col, ylab = OVERLAY_MAP[choice]
-    y = df_src[col].copy()
+    y = _overlay_series(df_src, choice, mode, df_resampled)
+
+    ax2 = ax.twinx()
+    ax2.plot(y, color="firebrick", linewidth=1, alpha=0.30, label=choice, zorder=0)
+    ax2.set_ylabel(OVERLAY_MAP[choice][1], color="firebrick")
+    ax2.tick_params(axis="y", colors="firebrick")
+
+    _combine_legends(ax, ax2)
+    return ax2
+
+def update_overlay_curve(ax, ax2, df_src: pd.DataFrame, choice: str, mode: str,
+                         *, df_resampled: pd.DataFrame | None = None) -> None:
+    """
+    Remplacer les données de la courbe secondaire existante, sans recréer l’axe.
+
+    Paramètres :
+        - ax / ax2 : matplotlib.axes.Axes
+            Axe principal et axe droit renvoyé par `add_overlay_curve`.
+        - choice : str
+            Nouvelle clé de ``OVERLAY_MAP`` (différente de « None »).
+        - Les autres paramètres sont identiques à `add_overlay_curve`.
+    """
+
+    y = _overlay_series(df_src, choice, mode, df_resampled)
+
+    line = ax2.lines[0]
+    line.set_data(y.index, y.to_numpy())
+    line.set_label(choice)
+    ax2.set_ylabel(OVERLAY_MAP[choice][1], color="firebrick")
+    ax2.relim()
+    ax2.autoscale_view(scalex=False)
+
+    _combine_legends(ax, ax2)
+
+def _overlay_series(df_src: pd.DataFrame, choice: str, mode: str,
+                    df_resampled: pd.DataFrame | None) -> pd.Series:
+    """Extraire la série superposée, réalignée sur 24 h si besoin."""
+
+    col = OVERLAY_MAP[choice][0]
 
     # Aligner l’index sur BASE_DATE si la vue est en 24 h ─────────────────────
-    if mode in {"24h", "mean24h", "supermean24h"}:
-        y.index = BASE_DATE + (y.index - y.index.normalize())
-        if mode != "24h":
-            y = y.resample(RESAMPLE_24H).mean()
+    if mode in {"mean24h", "supermean24h"}:
+        src = df_resampled if df_resampled is not None else resample_24h(df_src[[col]])
+        y = src[col].copy()
+    else:
+        y = df_src[col].copy()
+        if mode == "24h":
+            y.index = BASE_DATE + (y.index - y.index.normalize())
 
     # Conversion spéciale tension Terre : volts → millivolts
     if choice == "Tension terre":
         y *= 1000
+    return y
 
-    ax2 = ax.twinx()
-    ax2.plot(y, color="firebrick", linewidth=1, alpha=0.30, label=choice, zorder=0)
-    ax2.set_ylabel(ylab, color="firebrick")
-    ax2.tick_params(axis="y", colors="firebrick")
+def _combine_legends(ax, ax2) -> None:
+    """Réunir les légendes des deux axes sur l’axe droit."""
 
-    # Combiner les légendes ───────────────────────────────────────────────────
     lines1, labels1 = ax.get_legend_handles_labels()
     lines2, labels2 = ax2.get_legend_handles_labels()
-    ax2.legend(lines1 + lines2, labels1 + labels2, fontsize=8, framealpha=0.9)
\ No newline at end of file
+    ax2.legend(lines1 + lines2, labels1 + labels2, fontsize=8, framealpha=0.9)
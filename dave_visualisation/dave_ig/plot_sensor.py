@@ -1,16 +1,16 @@
-from datetime import timedelta
 import matplotlib.pyplot as plt
 import pandas as pd
 
-from .mpl_tools import format_axes
-from .signal_tools import annotate_extremes, stats_str, split_by_day
-from .config import BASE_DATE, RESAMPLE_24H
+from .mpl_tools import format_axes, plot_decimated, plot_lines
+from .signal_tools import annotate_extremes, stats_label, split_by_day, resample_24h
+from .io_tools import ensure_humidity_soil_percent
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Plots capteurs environnementaux
 # ─────────────────────────────────────────────────────────────────────────────
 def plot_sensor_data(df: pd.DataFrame, gs, ax_shared, fig, x_min: pd.Timestamp,
-                     x_max: pd.Timestamp, v_sec: int, v_eau: int) -> None:
+                     x_max: pd.Timestamp, v_sec: int, v_eau: int, *, max_points: int | None = None,
+                     show_stats_label: bool = True) -> None:
     """
     Tracer température, humidités (air + sol) et luminosité (baseline / stress).
 
@@ -24,56 +24,61 @@ def plot_sensor_data(df: pd.DataFrame, gs, ax_shared, fig, x_min: pd.Timestamp,
         - fig : matplotlib.figure.Figure
             Figure parente.
         - x_min / x_max : pandas.Timestamp
-            Limites temporelles pour `format_axes`.
+            Plage affichée ; l’axe X est partagé avec `ax_shared`, déjà borné.
         - v_sec / v_eau : int
             Tensions de référence pour le calcul d’humidité du sol.
+        - max_points : int | None
+            Points tracés par courbe (enveloppe min/max) ; `None` = pleine résolution.
+        - show_stats_label : bool
+            Ajouter σ / IQR / médiane aux légendes (`stats_str`) ; `False` = nom seul.
     """
 
     # ── Température ──────────────────────────────────────────────────────────
     ax_temp = fig.add_subplot(gs[0, 1], sharex=ax_shared)
-    line = ax_temp.plot(df["temp_degC"], color="m", linewidth=1.5, label=stats_str(df["temp_degC"]))[0]
+    line = plot_decimated(ax_temp, df["temp_degC"], max_points, color="m", linewidth=1.5, label=stats_label("", df["temp_degC"], show_stats_label))[0]
     annotate_extremes(ax_temp, df["temp_degC"], color=line.get_color())
-    format_axes(ax_temp, ylabel="Température (°C)", xmin=x_min, xmax=x_max)
-    ax_temp.legend(title="Température", fontsize=8, framealpha=0.9)
+    format_axes(ax_temp, ylabel="Température (°C)", skip_xaxis=True)
+    if show_stats_label:    # Légende = statistiques seules
+        ax_temp.legend(title="Température", fontsize=8, framealpha=0.9)
 
     # ── Humidités (air + sol) ────────────────────────────────────────────────
     ax_hum = fig.add_subplot(gs[1, 1], sharex=ax_shared)
 
-    # Convertir la mesure brut « soil_moisture » → % humidité du sol
-    df["humidity_soil_percent"] = ((v_sec - df["soil_moisture"]) / (v_sec - v_eau) * 100)
+    # % humidité du sol : normalement déjà calculé au chargement
+    ensure_humidity_soil_percent(df, v_sec, v_eau)
 
     # Air
-    line_air = ax_hum.plot(df["humidity_air_percent"], color="darkturquoise", linewidth=1.5,
-                           label=f"Air\n{stats_str(df['humidity_air_percent'])}")[0]
+    line_air = plot_decimated(ax_hum, df["humidity_air_percent"], max_points, color="darkturquoise", linewidth=1.5,
+                              label=stats_label("Air", df["humidity_air_percent"], show_stats_label))[0]
 
     annotate_extremes(ax_hum, df["humidity_air_percent"], color=line_air.get_color())
 
     # Sol
-    line_soil = ax_hum.plot(df["humidity_soil_percent"], color="royalblue", linewidth=1.5,
-                            label=f"Sol\n{stats_str(df['humidity_soil_percent'])}")[0]
+    line_soil = plot_decimated(ax_hum, df["humidity_soil_percent"], max_points, color="royalblue", linewidth=1.5,
+                               label=stats_label("Sol", df["humidity_soil_percent"], show_stats_label))[0]
 
     annotate_extremes(ax_hum, df["humidity_soil_percent"], color=line_soil.get_color())
 
-    format_axes(ax_hum, ylabel="Humidité (%)", xmin=x_min, xmax=x_max)
+    format_axes(ax_hum, ylabel="Humidité (%)", skip_xaxis=True)
     ax_hum.legend(fontsize=8, framealpha=0.9)
 
     # ── Luminosité ───────────────────────────────────────────────────────────
     ax_light = fig.add_subplot(gs[2, 1], sharex=ax_shared)
-    line_base = ax_light.plot(df["light_intensity_baseline"], color="gold", linewidth=1.5,
-                              label=f"Baseline\n{stats_str(df['light_intensity_baseline'])}")[0]
+    line_base = plot_decimated(ax_light, df["light_intensity_baseline"], max_points, color="gold", linewidth=1.5,
+                                 label=stats_label("Baseline", df["light_intensity_baseline"], show_stats_label))[0]
 
     annotate_extremes(ax_light, df["light_intensity_baseline"], color=line_base.get_color())
 
-    line_stress = ax_light.plot(df["light_intensity_stressor"], color="black", linewidth=1.5,
-                                label=f"Stress\n{stats_str(df['light_intensity_stressor'])}")[0]
+    line_stress = plot_decimated(ax_light, df["light_intensity_stressor"], max_points, color="black", linewidth=1.5,
+                                   label=stats_label("Stress", df["light_intensity_stressor"], show_stats_label))[0]
 
     annotate_extremes(ax_light, df["light_intensity_stressor"], color=line_stress.get_color())
 
-    format_axes(ax_light, xlabel="Temps", ylabel="Intensité lumineuse", xmin=x_min, xmax=x_max)
+    format_axes(ax_light, xlabel="Temps", ylabel="Intensité lumineuse", skip_xaxis=True)
     ax_light.legend(fontsize=8, framealpha=0.9)
 
 
-def plot_sensor_data_24h(df: pd.DataFrame, gs, ax_shared, fig) -> None:
+def plot_sensor_data_24h(df: pd.DataFrame, gs, ax_shared, fig, *, max_points: int | None = None) -> None:
     """
     Superposer les capteurs sur 24 h, couleur par journée (vue « 24 h »).
 
@@ -81,66 +86,68 @@ def plot_sensor_data_24h(df: pd.DataFrame, gs, ax_shared, fig) -> None:
         - df : pandas.DataFrame
             Données brutes.
         - gs, ax_shared, fig : objets Matplotlib analogues à `plot_sensor_data`.
+        - max_points : int | None
+            Points tracés par courbe (enveloppe min/max) ; `None` = pleine résolution.
     """
 
     daily_groups = split_by_day(df)
     cmap = plt.get_cmap("tab10", len(daily_groups))
+    colors = [cmap(i) for i in range(len(daily_groups))]
+    days = [g for _, g in daily_groups]
 
     # Température -------------------------------------------------------------
     ax_temp = fig.add_subplot(gs[0, 1], sharex=ax_shared)
-    for i, (_, g) in enumerate(daily_groups):
-        ax_temp.plot(g["temp_degC"], color=cmap(i), linewidth=1.4)
+    plot_lines(ax_temp, [g["temp_degC"] for g in days], colors, max_points, linewidths=1.4)
 
-    format_axes(ax_temp, ylabel="Température (°C)", xmin=BASE_DATE, xmax=BASE_DATE + timedelta(hours=23, minutes=59))
+    format_axes(ax_temp, ylabel="Température (°C)", skip_xaxis=True)
     ax_temp.set_title("Température", fontsize=9)
 
     # Humidités ---------------------------------------------------------------
     ax_hum = fig.add_subplot(gs[1, 1], sharex=ax_shared)
-    for i, (_, g) in enumerate(daily_groups):
-        ax_hum.plot(g["humidity_air_percent"], color=cmap(i), linewidth=1.4, alpha=0.6)
-        ax_hum.plot(g["humidity_soil_percent"], color=cmap(i), linewidth=1.4)
+    plot_lines(ax_hum, [g["humidity_air_percent"] for g in days], colors, max_points, linewidths=1.4, alpha=0.6)
+    plot_lines(ax_hum, [g["humidity_soil_percent"] for g in days], colors, max_points, linewidths=1.4)
 
-    format_axes(ax_hum, ylabel="Humidité (%)", xmin=BASE_DATE, xmax=BASE_DATE + timedelta(hours=23, minutes=59))
+    format_axes(ax_hum, ylabel="Humidité (%)", skip_xaxis=True)
     ax_hum.set_title("Air (α 0,6)  &  Sol", fontsize=9)
 
     # Luminosité --------------------------------------------------------------
     ax_light = fig.add_subplot(gs[2, 1], sharex=ax_shared)
-    for i, (_, g) in enumerate(daily_groups):
-        ax_light.plot(g["light_intensity_baseline"], color=cmap(i), linewidth=1.4, alpha=0.6)
+    plot_lines(ax_light, [g["light_intensity_baseline"] for g in days], colors, max_points, linewidths=1.4, alpha=0.6)
 
-    format_axes(ax_light, xlabel="Heure", ylabel="Intensité lumineuse", xmin=BASE_DATE,
-                xmax=BASE_DATE + timedelta(hours=23, minutes=59))
+    format_axes(ax_light, xlabel="Heure", ylabel="Intensité lumineuse", skip_xaxis=True)
     ax_light.set_title("Baseline (α 0,6)", fontsize=9)
 
 
-def plot_sensor_data_mean24h(df: pd.DataFrame, gs, ax_shared, fig, v_sec: int, v_eau: int) -> None:
+def plot_sensor_data_mean24h(df: pd.DataFrame, gs, ax_shared, fig, v_sec: int, v_eau: int,
+                             *, df_resampled: pd.DataFrame | None = None) -> None:
     """
     Afficher la moyenne 24 h des capteurs (un cycle typique).
 
     Paramètres :
         - df : pandas.DataFrame
             Données brutes multi‑jours.
+        - df_resampled : pandas.DataFrame | None
+            Cycle 24 h moyen déjà calculé (avec l’humidité du sol) ; `None` = calcul ici.
         - Les autres paramètres sont analogues aux fonctions précédentes.
     """
 
-    df = df.copy()
-    df["humidity_soil_percent"] = ((v_sec - df["soil_moisture"]) / (v_sec - v_eau) * 100)
-
     # Aligner toutes les journées sur BASE_DATE puis rééchantillonner à 10 s
-    df.index = BASE_DATE + (df.index - df.index.normalize())
-    df_resampled = df.resample(RESAMPLE_24H).mean()
+    if df_resampled is None:
+        if "humidity_soil_percent" not in df.columns:
+            df = ensure_humidity_soil_percent(df.copy(deep=False), v_sec, v_eau)
+        df_resampled = resample_24h(df)
 
     # Température -------------------------------------------------------------
     ax_temp = fig.add_subplot(gs[0, 1], sharex=ax_shared)
     ax_temp.plot(df_resampled["temp_degC"], color="magenta", linewidth=1.5)
-    format_axes(ax_temp, ylabel="Température (°C)", xmin=BASE_DATE, xmax=BASE_DATE + timedelta(hours=23, minutes=59))
+    format_axes(ax_temp, ylabel="Température (°C)", skip_xaxis=True)
     ax_temp.set_title("Température moyenne")
 
     # Humidité ----------------------------------------------------------------
     ax_hum = fig.add_subplot(gs[1, 1], sharex=ax_shared)
     ax_hum.plot(df_resampled["humidity_air_percent"], color="turquoise", linewidth=1.5, label="Air")
     ax_hum.plot(df_resampled["humidity_soil_percent"], color="royalblue", linewidth=1.5, label="Sol")
-    format_axes(ax_hum, ylabel="Humidité (%)", xmin=BASE_DATE, xmax=BASE_DATE + timedelta(hours=23, minutes=59))
+    format_axes(ax_hum, ylabel="Humidité (%)", skip_xaxis=True)
     ax_hum.set_title("Humidité moyenne")
     ax_hum.legend(fontsize=8)
 
@@ -148,7 +155,6 @@ def plot_sensor_data_mean24h(df: pd.DataFrame, gs, ax_shared, fig, v_sec: int, v
     ax_light = fig.add_subplot(gs[2, 1], sharex=ax_shared)
     ax_light.plot(df_resampled["light_intensity_baseline"], color="gold", linewidth=1.5, label="Baseline")
     ax_light.plot(df_resampled["light_intensity_stressor"], color="black", linewidth=1.5, label="Stress")
-    format_axes(ax_light, xlabel="Heure", ylabel="Luminosité", xmin=BASE_DATE,
-                xmax=BASE_DATE + timedelta(hours=23, minutes=59))
+    format_axes(ax_light, xlabel="Heure", ylabel="Luminosité", skip_xaxis=True)
     ax_light.set_title("Luminosité moyenne")
     ax_light.legend(fontsize=8)
\ No newline at end of file
@@ -1,17 +1,22 @@
 from datetime import timedelta
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.colors import to_hex
 
-from .signal_tools import lowpass_filter, rolling_stats, annotate_extremes, split_by_day, stats_str
-from .mpl_tools import format_axes, draw_sigma
-from .config import BASE_DATE, RESAMPLE_24H, ROLLING_WINDOW
+from .signal_tools import lowpass_filter_columns, rolling_stats_many, annotate_extremes, split_by_day, stats_label, resample_24h
+from .mpl_tools import format_axes, draw_sigma, plot_decimated, plot_lines, sigma_band_px, sigma_resolvable
+from .config import BASE_DATE, ROLLING_WINDOW
+
+_CHAN_COLS = ["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V"]    # Canaux plante
+_VOLT_COLS = [*_CHAN_COLS, "chan4_voltage_V"]                               # Plante + Terre
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Plots des tensions des plantes et de la terre
 # ─────────────────────────────────────────────────────────────────────────────
 def plot_voltage(df: pd.DataFrame, gs, fig, x_min: pd.Timestamp, x_max: pd.Timestamp,
-                 *, cutoff_hz: float | None = None, show_sigma: bool = True):
+                 *, cutoff_hz: float | None = None, show_sigma: bool = True, max_points: int | None = None,
+                 show_stats_label: bool = True, stats_cache: dict | None = None, stats_key: tuple = ()):
     """
     Vue « classique » : Chan 1‑3 empilés + Chan 4 (terre).
 
@@ -26,6 +31,12 @@ def plot_voltage(df: pd.DataFrame, gs, fig, x_min: pd.Timestamp, x_max: pd.Times
             Fréquence de coupure passe‑bas ; `None` = pas de filtrage.
         - show_sigma : bool
             Afficher ±1 σ glissant.
+        - max_points : int | None
+            Points tracés par courbe (enveloppe min/max) ; `None` = pleine résolution.
+        - show_stats_label : bool
+            Ajouter σ / IQR / médiane aux légendes (`stats_str`) ; `False` = nom seul.
+        - stats_cache / stats_key : dict | None, tuple
+            Cache des ±σ (`rolling_stats_cached`) et clé identifiant `df`.
 
     Retour :
         - matplotlib.axes.Axes
@@ -36,50 +47,60 @@ def plot_voltage(df: pd.DataFrame, gs, fig, x_min: pd.Timestamp, x_max: pd.Times
     # Crée l’axe principal (canaux 1 à 3 superposés) en haut de la colonne gauche
     # Liste des colonnes correspondant aux canaux d’entrée (fils sur plante)
     ax_voltage = fig.add_subplot(gs[:2, 0])
-    channels = ["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V"]
+    ax_terre = fig.add_subplot(gs[2, 0], sharex=ax_voltage)  # Canal Terre, en dessous
+    channels = _CHAN_COLS
+
+    # Bloc N × 4 (plante + terre) : un seul filtrage passe-bas et une seule conversion en millivolts
+    volt_mv = lowpass_filter_columns(df, _VOLT_COLS, cutoff_hz or None)
+    volt_mv *= 1000
+
+    # Canal Terre : dernière colonne du bloc, tracé plus bas
+    terre_mv = pd.Series(volt_mv[:, 3], index=df.index)
+
+    # ±σ des 4 canaux calculés en parallèle si demandé (et visible)
+    datas = [pd.Series(volt_mv[:, i], index=df.index) for i in range(len(channels))]
+    keys = [("classic", *stats_key, c) for c in (*channels, "chan4_voltage_V")]
+    *sigmas, sigma_t = _sigma_stats([*zip(datas, keys[:3]), (terre_mv, keys[3])],
+                                    [ax_voltage] * 3 + [ax_terre], show_sigma, stats_cache)
 
     # Parcours des canaux pour les tracer sur le même axe
-    for idx, chan in enumerate(channels, start=1):
-        # Filtrage passe-bas si demandé, puis conversion en millivolts
-        data = (lowpass_filter(df[chan], cutoff_hz) if cutoff_hz else df[chan]) * 1000
+    for idx, data in enumerate(datas, start=1):
 
         # Trace la courbe de tension pour le canal courant
-        line = ax_voltage.plot(data, linewidth=1.5, label=f"Channel {idx}\n{stats_str(data)}")[0]
+        line = plot_decimated(ax_voltage, data, max_points, linewidth=1.5, label=stats_label(f"Channel {idx}", data, show_stats_label))[0]
 
         # Ajoute les annotations du min et max sur la courbe
         annotate_extremes(ax_voltage, data, color=line.get_color())
 
         # Tracer ±σ si demandé
-        if show_sigma:
-            mean, std = rolling_stats(data, ROLLING_WINDOW)
-            draw_sigma(ax_voltage, mean, std, color=line.get_color())
+        if sigmas[idx - 1] is not None:
+            mean, std = sigmas[idx - 1]
+            draw_sigma(ax_voltage, mean, std, color=line.get_color(), max_points=max_points)
 
     # Mise en forme des axes : limites X, labels, grille, format date
     format_axes(ax_voltage, ylabel="Voltage (mV)", xmin=x_min, xmax=x_max)
 
     # ── Canal Terre (Chan 4) ─────────────────────────────────────────────────
     # Ce canal est tracé en dessous, sur un axe séparé
-    ax_terre = fig.add_subplot(gs[2, 0], sharex=ax_voltage)
-
-    # Même logique que ci-dessus : filtrage éventuel + conversion mV
-    terre_mv = (lowpass_filter(df["chan4_voltage_V"], cutoff_hz) if cutoff_hz else df["chan4_voltage_V"]) * 1000
-    line = ax_terre.plot(terre_mv, color="brown", linewidth=1.5, label=f"Channel 4 (Terre)\n{stats_str(terre_mv)}")[0]
+    line = plot_decimated(ax_terre, terre_mv, max_points, color="brown", linewidth=1.5,
+                          label=stats_label("Channel 4 (Terre)", terre_mv, show_stats_label))[0]
 
     # Annotation des extrêmes
     annotate_extremes(ax_terre, terre_mv, color=line.get_color())
 
     # Tracer ±σ si demandé
-    if show_sigma:
-        mean_t, std_t = rolling_stats(terre_mv, ROLLING_WINDOW)
-        draw_sigma(ax_terre, mean_t, std_t, color=line.get_color())
+    if sigma_t is not None:
+        mean_t, std_t = sigma_t
+        draw_sigma(ax_terre, mean_t, std_t, color=line.get_color(), max_points=max_points)
 
     # Mise en forme de l’axe X + légende
-    format_axes(ax_terre, xlabel="Temps", ylabel="Voltage (mV)", xmin=x_min, xmax=x_max)
+    format_axes(ax_terre, xlabel="Temps", ylabel="Voltage (mV)", skip_xaxis=True)
     ax_terre.legend(fontsize=8, framealpha=0.9)
 
     return ax_voltage
 
-def plot_voltage_24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True):
+def plot_voltage_24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True, max_points: int | None = None,
+                     stats_cache: dict | None = None, stats_key: tuple = ()):
     """
     Vue 24 h : superposition par jour — moyenne(Chan 1‑3) + Chan 4 (terre).
 
@@ -93,6 +114,10 @@ def plot_voltage_24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True):
             Grille et figure cibles.
         - show_sigma : bool
             Afficher ±1 σ glissant.
+        - max_points : int | None
+            Points tracés par courbe (enveloppe min/max) ; `None` = pleine résolution.
+        - stats_cache / stats_key : dict | None, tuple
+            Comme `plot_voltage`.
 
     Retour :
         - matplotlib.axes.Axes
@@ -104,40 +129,62 @@ def plot_voltage_24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True):
     ax_terre   = fig.add_subplot(gs[2, 0], sharex=ax_voltage)
 
     # Découper le DataFrame en sous-groupes par jour et réaligner sur BASE_DATE
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
     daily_groups = split_by_day(df)
     cmap = plt.get_cmap("tab10", len(daily_groups))  # Palette de couleurs
 
-    # Parcours des canaux pour les tracer sur le même axe
-    for i, (_day, g) in enumerate(daily_groups):
-        color = to_hex(cmap(i))  # Convertit RGBA → "#rrggbb" (attendu par les stubs)
-
-        # ── Moyenne des Chan 1-3 (plante) ────────────────────────────────────
-        g["voltage_mean"] = g[["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V"]].mean(axis=1) * 1000
-        ax_voltage.plot(g["voltage_mean"], color=color, linewidth=1.4)
-
-        # Tracer ±σ si demandé
-        if show_sigma:
-            mean, std = rolling_stats(g["voltage_mean"], ROLLING_WINDOW)
-            draw_sigma(ax_voltage, mean, std, color=color)
-
-        # ── Canal Terre ──────────────────────────────────────────────────────
-        terre_mv = g["chan4_voltage_V"] * 1000
-        ax_terre.plot(terre_mv, color=color, linewidth=1.2)
-
-        # Tracer ±σ si demandé
-        if show_sigma:
-            mean_t, std_t = rolling_stats(terre_mv, ROLLING_WINDOW)
-            draw_sigma(ax_terre, mean_t, std_t, color=color)
+    colors = [to_hex(cmap(i)) for i in range(len(daily_groups))]  # RGBA → "#rrggbb" (attendu par les stubs)
+
+    # ── Séries calculées une fois sur toute la plage, découpées ensuite par jour
+    voltage_mean = _chan_mean_mv(df)                # Moyenne des Chan 1-3 (plante)
+    terre_mv = df["chan4_voltage_V"] * 1000         # Canal Terre
+    stats_v, stats_t = _sigma_stats([(voltage_mean, ("24h", *stats_key, "voltage_mean")),
+                                     (terre_mv, ("24h", *stats_key, "chan4_voltage_V"))],
+                                    [ax_voltage, ax_terre], show_sigma, stats_cache)
+    if stats_v is not None:
+        mean, std = (s.to_numpy() for s in stats_v)
+    if stats_t is not None:
+        mean_t, std_t = (s.to_numpy() for s in stats_t)
+
+    # Collecter les courbes de chaque jour, puis une seule LineCollection par axe
+    # (les journées de `split_by_day` se suivent dans l’ordre de `df`)
+    means, terres, sigma_v, sigma_t = [], [], [], []
+    start = 0
+    for _day, g in daily_groups:
+        day = slice(start, start + len(g))
+        start = day.stop
+        means.append(pd.Series(voltage_mean.to_numpy()[day], index=g.index))
+        terres.append(pd.Series(terre_mv.to_numpy()[day], index=g.index))
+
+        # ±σ si demandé (bornes haute et basse)
+        if stats_v is not None:
+            sigma_v += [pd.Series(mean[day] + std[day], index=g.index),
+                        pd.Series(mean[day] - std[day], index=g.index)]
+        if stats_t is not None:
+            sigma_t += [pd.Series(mean_t[day] + std_t[day], index=g.index),
+                        pd.Series(mean_t[day] - std_t[day], index=g.index)]
+
+    plot_lines(ax_voltage, means, colors, max_points, linewidths=1.4)
+    plot_lines(ax_terre, terres, colors, max_points, linewidths=1.2)
+
+    # Bandes ±σ, sauf si elles restent sous le pixel une fois les courbes tracées
+    sigma_colors = [c for c in colors for _ in range(2)]
+    if stats_v is not None and sigma_band_px(ax_voltage, std) >= 1.0:
+        plot_lines(ax_voltage, sigma_v, sigma_colors, max_points, linestyles=":", linewidths=1)
+    if stats_t is not None and sigma_band_px(ax_terre, std_t) >= 1.0:
+        plot_lines(ax_terre, sigma_t, sigma_colors, max_points, linestyles=":", linewidths=1)
 
     # ── Mise en forme des axes ───────────────────────────────────────────────
     xmin, xmax = BASE_DATE, BASE_DATE + timedelta(hours=23, minutes=59)
     format_axes(ax_voltage, ylabel="Voltage moyen (mV)", xmin=xmin, xmax=xmax)
-    format_axes(ax_terre,  xlabel="Heure", ylabel="Voltage (mV)", xmin=xmin, xmax=xmax)
+    format_axes(ax_terre,  xlabel="Heure", ylabel="Voltage (mV)", skip_xaxis=True)
     ax_voltage.legend(title="Jour", fontsize=8, framealpha=0.9)
 
     return ax_voltage
 
-def plot_voltage_mean24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True):
+def plot_voltage_mean24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True,
+                         df_resampled: pd.DataFrame | None = None):
     """
     Moyenne 24 h individuelle : Chan 1‑3 empilés + Chan 4 (terre).
 
@@ -151,30 +198,34 @@ def plot_voltage_mean24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True):
             Grille et figure matplotlib.
         - show_sigma : bool
             Afficher ±1 σ glissant.
+        - df_resampled : pandas.DataFrame | None
+            Cycle 24 h moyen déjà calculé (`resample_24h`) ; `None` = calcul ici.
 
     Retour :
         - matplotlib.axes.Axes
             Axe principal (Chan 1‑3).
     """
 
-    # Réaligner sur BASE_DATE pour superposition horaire
-    df = df.copy()
-    df.index = BASE_DATE + (df.index - df.index.normalize())
-
-    # Moyenne par pas de 10 s
-    df_resampled = df.resample(RESAMPLE_24H).mean()
+    # Réaligner sur BASE_DATE puis moyenner par pas de 10 s
+    if df_resampled is None:
+        df_resampled = resample_24h(df)
 
     # ── Préparation des axes (même logique que plot_voltage) ─────────────────
     ax_voltage = fig.add_subplot(gs[:2, 0])
 
+    # Canaux en mV (un bloc N × 4, une multiplication) ; ±σ des 4 canaux en parallèle si demandé
+    volt_mv = df_resampled[_VOLT_COLS].to_numpy(dtype=np.float64) * 1000.0
+    *datas, terre_mv = (pd.Series(volt_mv[:, i], index=df_resampled.index) for i in range(len(_VOLT_COLS)))
+    if show_sigma:
+        *sigmas, sigma_t = rolling_stats_many([(d, None) for d in (*datas, terre_mv)], ROLLING_WINDOW)
+
     # Parcours des canaux pour les tracer sur le même axe
-    for i, chan in enumerate(["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V"]):
-        data_mv = df_resampled[chan] * 1000
+    for i, data_mv in enumerate(datas):
         line = ax_voltage.plot(data_mv, linewidth=1.5, label=f"Channel {i+1} (moy.)")[0]
 
         # Tracer ±σ si demandé
         if show_sigma:
-            mean, std = rolling_stats(data_mv, ROLLING_WINDOW)
+            mean, std = sigmas[i]
             draw_sigma(ax_voltage, mean, std, color=line.get_color())
 
     # ── Mise en forme ────────────────────────────────────────────────────────
@@ -185,21 +236,21 @@ def plot_voltage_mean24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True):
 
     # ── Chan 4 (terre) ───────────────────────────────────────────────────────
     ax_terre = fig.add_subplot(gs[2, 0], sharex=ax_voltage)
-    terre_mv = df_resampled["chan4_voltage_V"] * 1000
     line = ax_terre.plot(terre_mv, color="brown", linewidth=1.5, label="Channel 4 (Terre)")[0]
 
     # Tracer ±σ si demandé
     if show_sigma:
-        mean_t, std_t = rolling_stats(terre_mv, ROLLING_WINDOW)
+        mean_t, std_t = sigma_t
         draw_sigma(ax_terre, mean_t, std_t, color=line.get_color())
 
     # Mettre en forme les axes
-    format_axes(ax_terre, xlabel="Heure", ylabel="Voltage (mV)", xmin=xt_min, xmax=xt_max)
+    format_axes(ax_terre, xlabel="Heure", ylabel="Voltage (mV)", skip_xaxis=True)
     ax_terre.legend(fontsize=8)
 
     return ax_voltage
 
-def plot_voltage_mean_chan24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True):
+def plot_voltage_mean_chan24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = True,
+                              df_resampled: pd.DataFrame | None = None):
     """
     Moyenne(Chan 1‑3) + Chan 4 (terre) – vue 24 h superposée.
 
@@ -213,6 +264,8 @@ def plot_voltage_mean_chan24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = T
             Grille et figure matplotlib.
         - show_sigma : bool
             Afficher ±1 σ glissant.
+        - df_resampled : pandas.DataFrame | None
+            Cycle 24 h moyen déjà calculé (`resample_24h`) ; `None` = calcul ici.
 
     Retour :
         - matplotlib.axes.Axes
@@ -220,35 +273,53 @@ def plot_voltage_mean_chan24h(df: pd.DataFrame, gs, fig, *, show_sigma: bool = T
     """
 
     # Réaligner sur BASE_DATE pour superposition horaire
-    df = df.copy()
-    df.index = BASE_DATE + (df.index - df.index.normalize())
-    df_res = df.resample(RESAMPLE_24H).mean()
+    df_res = df_resampled if df_resampled is not None else resample_24h(df)
 
     # ── Moyenne Chan 1-3 ─────────────────────────────────────────────────────
     ax_volt  = fig.add_subplot(gs[:2, 0])
-    chan_mean = df_res[["chan1_voltage_V", "chan2_voltage_V", "chan3_voltage_V"]].mean(axis=1) * 1000
+    chan_mean = _chan_mean_mv(df_res)
+    terre_mv = df_res["chan4_voltage_V"] * 1000
+    if show_sigma:
+        (mean, std), (mean_t, std_t) = rolling_stats_many([(chan_mean, None), (terre_mv, None)], ROLLING_WINDOW)
+
     line = ax_volt.plot(chan_mean, label="Moyenne Chan 1‑3", linewidth=1.5)[0]
 
     # Tracer ±σ si demandé
     if show_sigma:
-        mean, std = rolling_stats(chan_mean, ROLLING_WINDOW)
         draw_sigma(ax_volt, mean, std, color=line.get_color())
 
     # ── Chan 4 (Terre) ───────────────────────────────────────────────────────
     ax_terre = fig.add_subplot(gs[2, 0], sharex=ax_volt)
-    terre_mv = df_res["chan4_voltage_V"] * 1000
     line_t = ax_terre.plot(terre_mv, color="brown", linewidth=1.5, label="Channel 4 (Terre)")[0]
 
     # Tracer ±σ si demandé
     if show_sigma:
-        mean_t, std_t = rolling_stats(terre_mv, ROLLING_WINDOW)
         draw_sigma(ax_terre, mean_t, std_t, color=line_t.get_color())
 
     # ── Mise en forme ────────────────────────────────────────────────────────
     xt_min, xt_max = BASE_DATE, BASE_DATE + timedelta(hours=23, minutes=59)
     format_axes(ax_volt,  ylabel="Voltage moy. (mV)", xmin=xt_min, xmax=xt_max)
-    format_axes(ax_terre, xlabel="Heure", ylabel="Voltage (mV)", xmin=xt_min, xmax=xt_max)
+    format_axes(ax_terre, xlabel="Heure", ylabel="Voltage (mV)", skip_xaxis=True)
     ax_volt.legend(fontsize=8)
     ax_terre.legend(fontsize=8)
 
-    return ax_volt
\ No newline at end of file
+    return ax_volt
+
+def _chan_mean_mv(df: pd.DataFrame) -> pd.Series:
+    """Moyenne des canaux 1‑3 en mV, calculée sur un bloc NumPy float32 contigu."""
+
+    arr = df[_CHAN_COLS].to_numpy(dtype=np.float32, copy=False)
+    return pd.Series(arr.mean(axis=1) * 1000.0, index=df.index)
+
+def _sigma_stats(tasks: list[tuple[pd.Series, tuple]], axes: list, show_sigma: bool,
+                 cache: dict | None = None) -> list:
+    """(moyenne, σ) glissants des seules séries dont la bande ±σ serait visible ; `None` sinon."""
+
+    if not show_sigma:
+        return [None] * len(tasks)
+
+    keep = [i for i, ((series, _), ax) in enumerate(zip(tasks, axes)) if sigma_resolvable(ax, series)]
+    results: list = [None] * len(tasks)
+    for i, stats in zip(keep, rolling_stats_many([tasks[i] for i in keep], ROLLING_WINDOW, cache)):
+        results[i] = stats
+    return results
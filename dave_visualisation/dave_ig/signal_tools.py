@@ -1,10 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import Any
 import numpy as np
 import pandas as pd
+from numba import njit, prange
 from scipy import signal as sig
 
-from .config import ROLLING_WINDOW, BASE_DATE
+from .config import ROLLING_WINDOW, BASE_DATE, RESAMPLE_24H
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Utilitaires statistiques, filtrage et manipulation d’index
@@ -24,9 +25,170 @@ def rolling_stats(series: pd.Series, window: str = ROLLING_WINDOW) -> tuple[pd.S
             Moyenne glissante puis écart‑type glissant.
     """
 
-    rolling_mean = series.rolling(window, min_periods=1).mean() # calcul de la moyenne glissante
-    rolling_std  = series.rolling(window, min_periods=1).std()  # calcul de l'écart-type glissant
-    return rolling_mean, rolling_std
+    # Fenêtre temporelle → nombre d’échantillons (pas médian), puis une seule passe
+    # (un float32 est lu tel quel : le noyau accumule en float64)
+    values = series.to_numpy(dtype=np.result_type(series.dtype, np.float32))
+    rolling_mean, rolling_std = _rolling_mean_std_nb(values, _window_samples(series.index, window))
+    return pd.Series(rolling_mean, index=series.index), pd.Series(rolling_std, index=series.index)
+
+def rolling_stats_cached(series: pd.Series, key: tuple, cache: dict,
+                         window: str = ROLLING_WINDOW) -> tuple[pd.Series, pd.Series]:
+    """
+    Variante mémoïsée de `rolling_stats` pour les re‑rendus (options, zoom, vue).
+
+    Paramètres :
+        - series : pandas.Series
+            Série numérique indexée en temps.
+        - key : tuple
+            Identifiant des données de `series` (génération, vue, canal…).
+        - cache : dict
+            Cache de l’appelant, vidé quand les données changent ; seuls les
+            tableaux résultats y sont gardés, jamais la série d’entrée.
+        - window : str, optional
+            Fenêtre Pandas. Par défaut : ``ROLLING_WINDOW``.
+    """
+
+    arrays = cache.get((key, window))
+    if arrays is None:
+        mean, std = rolling_stats(series, window)
+        arrays = cache[(key, window)] = (mean.to_numpy(), std.to_numpy())
+    return pd.Series(arrays[0], index=series.index), pd.Series(arrays[1], index=series.index)
+
+def rolling_stats_many(tasks: list[tuple[pd.Series, tuple | None]], window: str = ROLLING_WINDOW,
+                       cache: dict | None = None) -> list[tuple[pd.Series, pd.Series]]:
+    """
+    Calculer en parallèle les statistiques glissantes de plusieurs séries.
+
+    Paramètres :
+        - tasks : list(tuple(pandas.Series, tuple | None))
+            (série, clé) ; clé passée à `rolling_stats_cached`, `None` = sans cache.
+        - window : str, optional
+            Fenêtre Pandas. Par défaut : ``ROLLING_WINDOW``.
+        - cache : dict | None
+            Cache de `rolling_stats_cached` ; `None` = aucun cache.
+
+    Retour :
+        - list(tuple(pandas.Series, pandas.Series))
+            (moyenne, écart‑type) dans l’ordre de `tasks`.
+
+    Notes :
+    Le noyau Numba libère le GIL (``nogil``) : les canaux d’une figure
+    sont traités simultanément sur un pool de 4 threads au plus.
+    """
+
+    def run(task: tuple[pd.Series, tuple | None]) -> tuple[pd.Series, pd.Series]:
+        series, key = task
+        if key is None or cache is None:
+            return rolling_stats(series, window)
+        return rolling_stats_cached(series, key, cache, window)
+
+    if len(tasks) < 2:
+        return [run(t) for t in tasks]
+
+    with ThreadPoolExecutor(max_workers=min(4, len(tasks))) as ex:
+        return list(ex.map(run, tasks))
+
+def _local_ticks(index: pd.DatetimeIndex) -> tuple[np.ndarray, str]:
+    """
+    Horodatage en entiers (heure locale affichée) et unité de l’index (``"ns"``, ``"us"``…).
+
+    Notes :
+    Un index avec fuseau horaire (CSV dont les horodatages portent un décalage)
+    est ramené à son heure locale : ``asi8`` donnerait des instants UTC.
+    """
+
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8, index.unit
+
+def _window_samples(index: pd.DatetimeIndex, window: str) -> int:
+    """Convertir une fenêtre Pandas (ex. ``"10min"``) en nombre d’échantillons."""
+
+    if len(index) < 2:
+        return 1
+
+    # Entiers dans l’unité de l’index (ns, µs…) : médiane bien plus rapide qu’en timedelta64
+    ticks, unit = _local_ticks(index)
+    dt = pd.Timedelta(float(np.median(np.diff(ticks))), unit=unit)
+    return max(1, int(pd.Timedelta(window) // dt)) if dt > pd.Timedelta(0) else 1
+
+@njit(cache=True, nogil=True)
+def _rolling_mean_std_nb(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Moyenne et écart‑type glissants (ddof=1) en une passe, sémantique ``min_periods=1``.
+
+    Notes :
+    Les NaN sont ignorés comme dans Pandas. Les sommes sont décalées par la
+    première valeur valide pour limiter la perte de précision de Σx².
+    Pas de ``fastmath`` : il supprimerait les tests de NaN.
+    """
+
+    n = values.shape[0]
+    mean = np.empty(n)
+    std = np.empty(n)
+
+    shift = 0.0
+    for i in range(n):
+        if not np.isnan(values[i]):
+            shift = values[i]
+            break
+
+    s = 0.0
+    s2 = 0.0
+    count = 0
+    for i in range(n):
+        v = values[i]
+        if not np.isnan(v):
+            d = v - shift
+            s += d
+            s2 += d * d
+            count += 1
+
+        if i >= window:
+            old = values[i - window]
+            if not np.isnan(old):
+                d = old - shift
+                s -= d
+                s2 -= d * d
+                count -= 1
+
+        if count == 0:
+            mean[i] = np.nan
+            std[i] = np.nan
+            continue
+
+        m = s / count
+        mean[i] = m + shift
+        if count < 2:
+            std[i] = np.nan
+        else:
+            var = (s2 - s * m) / (count - 1)
+            std[i] = np.sqrt(var) if var > 0.0 else 0.0
+
+    return mean, std
+
+@njit(cache=True, fastmath=True, parallel=True)
+def fused_sub_trend(c1, c2, c3, c4, out_c1, out_c2, out_c3, out_trend) -> None:
+    """
+    Soustraire Chan 4 des canaux 1‑3 et calculer leur moyenne (mV) en une passe.
+
+    Paramètres :
+        - c1 / c2 / c3 / c4 : numpy.ndarray
+            Tensions brutes (V), même longueur.
+        - out_c1 / out_c2 / out_c3 : numpy.ndarray
+            Sorties Chan 1‑3 − Chan 4 (V), préallouées.
+        - out_trend : numpy.ndarray
+            Sortie moyenne des 3 différences, en mV.
+    """
+
+    for i in prange(c1.shape[0]):
+        d1 = c1[i] - c4[i]
+        d2 = c2[i] - c4[i]
+        d3 = c3[i] - c4[i]
+        out_c1[i] = d1
+        out_c2[i] = d2
+        out_c3[i] = d3
+        out_trend[i] = (d1 + d2 + d3) * (1000.0 / 3.0)
 
 def stats_str(series: pd.Series) -> str:
     """
@@ -41,10 +203,20 @@ def stats_str(series: pd.Series) -> str:
             Chaîne « σ=…  IQR=…  Méd=… ».
     """
 
-    q1, median, q3 = np.percentile(series, [25, 50, 75])    # calcul du 1er quartile, médiane et 3ème quartile
-    iqr = q3 - q1                                              # calcul écart inter-quartile
+    # Travailler sur le tableau NumPy sous-jacent, sans élargir un float32 en float64
+    arr = series.to_numpy(dtype=np.result_type(series.dtype, np.float32))
+    q1, median, q3 = np.quantile(arr, [0.25, 0.5, 0.75])    # 1er quartile, médiane et 3ème quartile
+    iqr = q3 - q1                                            # calcul écart inter-quartile
+    std = np.nanstd(arr, ddof=1)                             # même convention que Series.std()
+
+    return f"σ={std:.4f}  IQR={iqr:.4f}  Méd={median:.4f}"
 
-    return f"σ={series.std():.4f}  IQR={iqr:.4f}  Méd={median:.4f}"
+def stats_label(name: str, series: pd.Series, enabled: bool = True) -> str:
+    """Libellé de légende : `name` suivi de `stats_str(series)`, ou `name` seul si `enabled` est faux."""
+
+    if not enabled:
+        return name
+    return f"{name}\n{stats_str(series)}" if name else stats_str(series)
 
 def annotate_extremes(ax, y: pd.Series, *, color: str) -> None:
     """
@@ -59,19 +231,40 @@ def annotate_extremes(ax, y: pd.Series, *, color: str) -> None:
             Couleur du texte (généralement celle de la courbe).
     """
 
-    # Récupérer l'y max et min de la série
-    idx_max = y.idxmax()
-    idx_min = y.idxmin()
+    # Récupérer l'y max et min de la série (une seule passe, dtype float conservé)
+    arr = y.to_numpy(dtype=np.result_type(y.dtype, np.float32))
+    i_min, i_max = _argminmax_nb(arr)
+    if i_max < 0:
+        return      # Série vide ou uniquement NaN
+
+    v_max, v_min = arr[i_max], arr[i_min]
+    idx_max, idx_min = y.index[i_max], y.index[i_min]
 
     # Ajouter les anotations :
     # max
-    ax.annotate(f"{y.max():.4f}", xy=(idx_max, y.max()), xytext=(0, 5), textcoords="offset points",
+    ax.annotate(f"{v_max:.4f}", xy=(idx_max, v_max), xytext=(0, 5), textcoords="offset points",
                 ha="center", va="bottom", fontsize=8, color=color)
 
     # min
-    ax.annotate(f"{y.min():.4f}", xy=(idx_min, y.min()),xytext=(0, -10), textcoords="offset points",
+    ax.annotate(f"{v_min:.4f}", xy=(idx_min, v_min),xytext=(0, -10), textcoords="offset points",
                 ha="center", va="top",   fontsize=8, color=color)
 
+@njit(cache=True)
+def _argminmax_nb(values: np.ndarray) -> tuple[int, int]:
+    """Indices (min, max) en une passe, NaN ignorés ; (-1, -1) si aucune valeur."""
+
+    i_min = -1
+    i_max = -1
+    for i in range(values.shape[0]):
+        v = values[i]
+        if np.isnan(v):
+            continue
+        if i_min < 0 or v < values[i_min]:
+            i_min = i
+        if i_max < 0 or v > values[i_max]:
+            i_max = i
+    return i_min, i_max
+
 def split_by_day(df: pd.DataFrame) -> list[tuple[pd.Timestamp, pd.DataFrame]]:
     """
     Découper un `DataFrame` journalier et réaligner chaque sous‑série sur 2000‑01‑01.
@@ -88,39 +281,78 @@ def split_by_day(df: pd.DataFrame) -> list[tuple[pd.Timestamp, pd.DataFrame]]:
     # Liste des tuples (date d’origine, DataFrame de la journée réindexé sur BASE_DATE)
     groups: list[tuple[pd.Timestamp, pd.DataFrame]] = []
 
-    # Parcourir chaque journée distincte et regrouper les données correspondantes
-    # Pour chaque journée unique, extraire les données et les préparer pour un affichage 24h
-    for day_key, grp in df.groupby(df.index.normalize()):
-        # Convertir explicitement la clé pour éviter un avertissement de type.
-        day: pd.Timestamp = pd.Timestamp(day_key)
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
 
-        # Copier le sous‑DataFrame pour éviter toute modification de l’original
-        shifted = grp.copy()
+    # Bornes de chaque journée sur l’index trié : une passe sur les entiers de l’horodatage,
+    # en heure locale pour un index avec fuseau (coupure à minuit local, pas UTC)
+    ticks, unit = _local_ticks(df.index)
+    ticks_per_day = int(np.timedelta64(1, "D") // np.timedelta64(1, unit))
+    starts = _day_offsets_nb(ticks, ticks_per_day)
+    ends = np.append(starts[1:], len(df))
 
-        # Conserver uniquement l’heure en déplaçant l’index sur BASE_DATE.
-        shifted.index = BASE_DATE + (shifted.index - day)
-        groups.append((day, shifted))
+    # Conserver uniquement l’heure : index décalé sur BASE_DATE en une seule opération
+    shifted_index = BASE_DATE + (df.index - df.index.normalize())
+
+    # Vues sur `df` (aucune copie des données) munies de leur tranche d’index
+    for start, end in zip(starts, ends):
+        day = df.index[start].normalize()
+        groups.append((day, df.iloc[start:end].set_axis(shifted_index[start:end])))
     return groups
 
+@njit(cache=True)
+def _day_offsets_nb(ts: np.ndarray, ticks_per_day: int) -> np.ndarray:
+    """Positions de début de chaque journée dans un horodatage entier trié."""
+
+    n = ts.shape[0]
+    starts = np.empty(n, dtype=np.int64)
+    count = 0
+    prev = 0
+    for i in range(n):
+        bucket = ts[i] // ticks_per_day
+        if i == 0 or bucket != prev:
+            starts[count] = i
+            count += 1
+            prev = bucket
+    return starts[:count]
+
+def resample_24h(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Réaligner toutes les journées sur `BASE_DATE` puis moyenner par ``RESAMPLE_24H``.
+
+    Paramètres :
+        - df : pandas.DataFrame
+            Indexé par un `DatetimeIndex` (plusieurs jours possibles).
+
+    Retour :
+        - pandas.DataFrame
+            Cycle 24 h moyen, indexé sur la journée `BASE_DATE`.
+    """
+
+    shifted = df.set_axis(BASE_DATE + (df.index - df.index.normalize()))
+    return shifted.resample(RESAMPLE_24H).mean()
+
 @lru_cache(maxsize=32)
-def _butter_coeff(cutoff_hz: float, fs: float, order: int = 4) -> tuple[Any, Any]:
+def _butter_coeff(cutoff_hz: float, fs: float, order: int = 4) -> np.ndarray:
     """
-    Calculer les coefficients d’un filtre passe‑bas de Butterworth.
+    Calculer un filtre passe‑bas de Butterworth en sections d’ordre 2 (SOS).
 
     Notes :
     Le résultat est mis en cache (lru_cache) car les mêmes couples
-    (cutoff_hz, fs, order) sont appelés à répétition.
+    (cutoff_hz, fs, order) sont appelés à répétition. La forme SOS reste
+    stable numériquement aux ordres élevés, contrairement à (b, a).
     """
 
+    # Tester avant de normaliser : fs peut être très faible (relevés épars ou décimés)
+    if fs <= 2 * cutoff_hz:
+        raise ValueError(f"La fréquence de coupure ({cutoff_hz} Hz) doit être < fs/2 (fs = {fs} Hz).")
+
     nyq = 0.5 * fs               # Fréquence de Nyquist
     wn  = cutoff_hz / nyq        # Fréquence normalisée (entre 0 et 1)
 
-    if wn >= 1:
-        raise ValueError("La fréquence de coupure doit être < fs/2.")
+    return sig.butter(order, wn, btype="low", output="sos")
 
-    return sig.butter(order, wn, btype="low")
-
-def lowpass_filter(series: pd.Series, cutoff_hz: float, order: int = 4) -> pd.Series:
+def lowpass_filter(series: pd.Series, cutoff_hz: float, order: int = 4, *, fs: float | None = None) -> pd.Series:
     """
     Appliquer un filtre passe‑bas Butterworth à une série.
 
@@ -131,27 +363,71 @@ def lowpass_filter(series: pd.Series, cutoff_hz: float, order: int = 4) -> pd.Se
             Fréquence de coupure (Hz). Si `None`, la série d’origine est renvoyée.
         - order : int, optional
             Ordre du filtre. Par défaut : 4.
+        - fs : float | None
+            Fréquence d’échantillonnage déjà connue (`sampling_rate`) ; `None` = déduite de l’index.
 
     Retour :
         - pandas.Series
             Série filtrée (index conservé).
 
     Notes :
-    La fonction saute le filtrage si la série est trop courte pour `scipy.signal.filtfilt`
-    (condition ``len(x) < 3 * max(len(a), len(b))``).
+    La fonction saute le filtrage si la série est trop courte pour `scipy.signal.sosfiltfilt`
+    (condition ``len(x) <= 3 * (2 * n_sections + 1)``, longueur de padding par défaut).
     """
 
     if cutoff_hz is None:
         return series   # Aucun filtrage demandé
 
-    # Déterminer la fréquence d’échantillonnage (Hz)
-    dt = series.index.to_series().diff().median().total_seconds()
-    fs = 1.0 / dt
-    b, a = _butter_coeff(cutoff_hz, fs, order=order)
+    sos = _butter_coeff(cutoff_hz, fs or sampling_rate(series.index), order=order)
 
-    # Condition minimale pour filtfilt : éviter ValueError
-    if len(series) < 3 * max(len(a), len(b)):
+    # Condition minimale pour sosfiltfilt : éviter ValueError
+    if len(series) <= 3 * (2 * sos.shape[0] + 1):
         return series   # Série trop courte → retour brut
 
-    filtered = sig.filtfilt(b, a, series.values, method="pad") # Filtrage passe-bas sans déphasage
-    return pd.Series(filtered, index=series.index)
\ No newline at end of file
+    filtered = sig.sosfiltfilt(sos, series.values) # Filtrage passe-bas sans déphasage
+    return pd.Series(filtered, index=series.index)
+
+def lowpass_filter_columns(df: pd.DataFrame, columns: list[str], cutoff_hz: float | None,
+                           order: int = 4, *, fs: float | None = None) -> np.ndarray:
+    """
+    Filtrer plusieurs colonnes d’un coup (un seul appel `sosfiltfilt`, ``axis=0``).
+
+    Paramètres :
+        - df : pandas.DataFrame
+            Données indexées en temps.
+        - columns : list[str]
+            Colonnes à filtrer (même fréquence d’échantillonnage).
+        - cutoff_hz / order / fs : comme `lowpass_filter` ; `None` = pas de filtrage.
+
+    Retour :
+        - numpy.ndarray
+            Nouveau tableau N × len(columns), modifiable en place.
+    """
+
+    arr = df[columns].to_numpy(dtype=np.float64, copy=True)
+    if cutoff_hz is None:
+        return arr
+
+    sos = _butter_coeff(cutoff_hz, fs or sampling_rate(df.index), order=order)
+    if len(arr) <= 3 * (2 * sos.shape[0] + 1):
+        return arr      # Trop court → données brutes
+
+    return sig.sosfiltfilt(sos, arr, axis=0)
+
+def sampling_rate(index: pd.DatetimeIndex) -> float:
+    """
+    Fréquence d’échantillonnage (Hz) déduite du pas médian de l’index.
+
+    Notes :
+    Arrondie à 6 chiffres significatifs : la gigue d’horodatage d’un canal à
+    l’autre ne change plus la clé de `_butter_coeff`, et le filtre n’est conçu
+    qu’une fois. Un arrondi absolu (au mHz) donnerait 0 pour un pas de plus de
+    2000 s.
+    """
+
+    # Entiers dans l’unité de l’index, comme `_window_samples`
+    ticks, unit = _local_ticks(index)
+    dt = pd.Timedelta(float(np.median(np.diff(ticks))), unit=unit).total_seconds()
+    if not dt > 0:
+        raise ValueError("Pas d’échantillonnage nul ou indéfini : fréquence d’échantillonnage inconnue.")
+    return float(f"{1.0 / dt:.6g}")
\ No newline at end of file
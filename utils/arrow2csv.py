@@ -0,0 +1,37 @@
+"""
+Conversion d'un fichier de capture Arrow IPC (capture lancée avec `file_format="arrow"`) en CSV,
+au même format que les captures CSV. Utilisable hors du Raspberry Pi (pas besoin du grovepi) :
+	python utils/arrow2csv.py captured_data.arrow [autre.arrow ...]
+"""
+
+import os
+import sys
+import pyarrow as pa
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"  # Identique à capture_core.TIMESTAMP_FORMAT
+
+def arrow_to_csv(arrow_file, csv_file=None):
+	"""
+	Convertit un fichier de capture Arrow IPC en CSV, bloc par bloc (mémoire bornée).
+	Le fichier peut contenir plusieurs flux à la suite : une capture relancée sur le même fichier y ajoute le sien.
+
+	:param arrow_file: fichier Arrow IPC écrit par la capture
+	:param csv_file: fichier CSV à écrire ; par défaut, même nom avec l'extension .csv
+	:return: nom du fichier CSV écrit
+	:rtype: str
+	"""
+	if csv_file is None:
+		csv_file = os.path.splitext(arrow_file)[0] + ".csv"
+
+	size = os.path.getsize(arrow_file)
+	header = True
+	with open(arrow_file, "rb") as source, open(csv_file, "w", newline='') as target:
+		while source.tell() < size:
+			for batch in pa.ipc.open_stream(source):
+				batch.to_pandas().to_csv(target, header=header, index=False, lineterminator="\n", date_format=TIMESTAMP_FORMAT)
+				header = False
+	return csv_file
+
+if __name__ == "__main__":
+	for arrow_file in sys.argv[1:]:
+		print(arrow_to_csv(arrow_file))
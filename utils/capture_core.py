@@ -0,0 +1,335 @@
+from grovepi import *
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import queue
+import threading
+from functools import partial
+
+FLUSH_EVERY = 100  # Nombre de lignes accumulées avant chaque écriture (et vidage) dans le CSV
+MAX_PENDING_CHUNKS = 16  # Blocs en attente d'écriture au-delà desquels la capture attend le disque
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+SENSOR_COLUMNS = ["temp_degC", "humidity_air_percent", "light_intensity_baseline", "light_intensity_stressor", "soil_moisture"]
+INITIAL_CAPACITY = 1024  # Nombre de lignes allouées au départ dans les tampons, quand les données sont conservées
+SENSOR_TIMEOUT = 0.5  # Attente maximale (s) des capteurs du grovepi après l'acquisition de l'oscilloscope
+
+# Configuration des capteurs d'environnement
+DHT_SENSOR_PORT = 7 # connect the DHt sensor to port 7
+DHT_SENSOR_TYPE = 0 # use 0 for the blue-colored sensor and 1 for the white-colored sensor
+LIGHT_SENSOR_PORT_TEMOIN = 0
+SOIL_MOISTURE_SENSOR_PORT = 1
+LIGHT_SENSOR_PORT_NOLIGHT = 2
+
+# Indices des compteurs d'échecs successifs, et noms utilisés dans le message d'erreur.
+# Les compteurs par canal de l'oscilloscope suivent, à partir de FAIL_CHANNELS
+FAIL_SCOPE, FAIL_DHT, FAIL_LIGHT, FAIL_MOISTURE, FAIL_CHANNELS = range(5)
+FAIL_NAMES = ("scope", "dht sensor", "light sensor", "moisture sensor")
+
+def _grow(buffer):
+	"""
+	Double la capacité d'un tampon de capture (selon le premier axe), en conservant son contenu.
+
+	:param numpy.ndarray buffer: tampon plein
+	:return: nouveau tampon, deux fois plus long
+	:rtype: numpy.ndarray
+	"""
+	grown = np.empty((2 * len(buffer),) + buffer.shape[1:], dtype=buffer.dtype)
+	grown[:len(buffer)] = buffer
+	return grown
+
+def _to_local_datetime64(timestamps_ns):
+	"""
+	Convertit des horodatages `time.time_ns()` (UTC) en datetime64 à l'heure locale, comme `dt.now()`.
+	Le décalage horaire est lu une fois par bloc ; il n'est recalculé ligne à ligne que si le bloc
+	chevauche un changement d'heure.
+
+	:param numpy.ndarray timestamps_ns: horodatages en nanosecondes depuis l'epoch (int64)
+	:return: horodatages locaux, à la microseconde
+	:rtype: numpy.ndarray
+	"""
+	if len(timestamps_ns) == 0:
+		return np.empty(0, dtype="datetime64[us]")
+	seconds = timestamps_ns // 1_000_000_000
+	first_offset = time.localtime(int(seconds[0])).tm_gmtoff
+	if first_offset == time.localtime(int(seconds[-1])).tm_gmtoff:
+		offsets = first_offset
+	else:
+		offsets = np.array([time.localtime(int(s)).tm_gmtoff for s in seconds])
+	return ((timestamps_ns + offsets * 1_000_000_000) // 1000).astype("datetime64[us]")
+
+def _write_chunk(file, logger, columns, timestamps, values):
+	"""
+	Écrit un bloc de lignes des tampons de capture dans le CSV (sans en-tête), en un seul appel au
+	writer C de pandas, puis vide le tampon du fichier sur le disque.
+
+	:param file: fichier CSV ouvert en ajout
+	:param logger: Logger qui servira à logger les erreurs d'écriture
+	:param list columns: noms des colonnes de `values`
+	:param numpy.ndarray timestamps: horodatages des lignes du bloc (`time.time_ns()`)
+	:param numpy.ndarray values: valeurs des lignes du bloc, une colonne par grandeur
+	"""
+	chunk = pd.DataFrame(values, columns=columns, copy=False)
+	chunk.insert(0, "timestamp", _to_local_datetime64(timestamps))
+	try:
+		chunk.to_csv(file, header=False, index=False, lineterminator="\n", date_format=TIMESTAMP_FORMAT)
+		file.flush()
+	except IOError as e:
+		logger.error(f"CSV write failed for rows starting at timestamp {chunk['timestamp'].iloc[0]}", exc_info=e)
+
+def _write_arrow_chunk(stream, file, logger, schema, timestamps, values):
+	"""
+	Écrit un bloc de lignes des tampons de capture dans le flux Arrow IPC (binaire, sans formatage
+	texte), puis vide le tampon du fichier sur le disque. Les NaN deviennent des valeurs nulles,
+	comme les champs vides du CSV.
+
+	:param stream: flux `pyarrow.ipc.new_stream` ouvert sur `file`
+	:param file: fichier binaire ouvert en ajout
+	:param logger: Logger qui servira à logger les erreurs d'écriture
+	:param schema: schéma Arrow du flux (timestamp puis une colonne float64 par grandeur)
+	:param numpy.ndarray timestamps: horodatages des lignes du bloc (`time.time_ns()`)
+	:param numpy.ndarray values: valeurs des lignes du bloc, une colonne par grandeur
+	"""
+	import pyarrow as pa
+
+	local_timestamps = _to_local_datetime64(timestamps)
+	arrays = [pa.array(local_timestamps)] + [pa.array(values[:, i], from_pandas=True) for i in range(values.shape[1])]
+	try:
+		stream.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+		file.flush()
+	except IOError as e:
+		logger.error(f"Arrow write failed for rows starting at timestamp {local_timestamps[0]}", exc_info=e)
+
+def _drain(chunks, write_chunk, logger):
+	"""
+	Boucle du thread d'écriture : écrit dans le fichier les blocs reçus par la file, jusqu'à la sentinelle
+	`None`. Les lenteurs de la carte SD (write, flush) sont ainsi absorbées hors de la boucle de capture.
+
+	:param queue.Queue chunks: file des blocs `(timestamps, values)` à écrire
+	:param write_chunk: fonction `write_chunk(timestamps, values)` qui écrit un bloc (CSV ou Arrow)
+	:param logger: Logger qui servira à logger les erreurs d'écriture
+	"""
+	while (chunk := chunks.get()) is not None:
+		try:
+			write_chunk(*chunk)
+		except Exception as e:
+			logger.error("Writer thread failed on a chunk", exc_info=e)
+
+def _read_all_sensors():
+	"""
+	Lit successivement tous les capteurs du grovepi. Appelée dans un thread pendant l'acquisition
+	de l'oscilloscope, pour que les allers-retours I2C soient masqués par la fenêtre d'acquisition.
+	L'échec d'un capteur n'empêche pas la lecture des suivants : l'exception est renvoyée à la place
+	de la valeur, et c'est la boucle de capture qui la journalise et compte les échecs.
+
+	:return: triplet ([temp, hum], (témoin, stressor), humidité du sol), chaque valeur pouvant être une exception
+	:rtype: tuple
+	"""
+	try:
+		dht_reading = dht(DHT_SENSOR_PORT, DHT_SENSOR_TYPE)
+	except Exception as e:
+		dht_reading = e
+	try:
+		light_reading = (analogRead(LIGHT_SENSOR_PORT_TEMOIN), analogRead(LIGHT_SENSOR_PORT_NOLIGHT))
+	except Exception as e:
+		light_reading = e
+	try:
+		moisture_reading = analogRead(SOIL_MOISTURE_SENSOR_PORT)
+	except Exception as e:
+		moisture_reading = e
+	return dht_reading, light_reading, moisture_reading
+
+def capture(acquire_voltages, nb_channels, output_file, logger, duration=0, with_sensor_data=False, max_fails=5, keep_data=False, file_format="csv"):
+	"""
+	Boucle de capture commune aux deux versions du banc : mesure les canaux de l'oscilloscope avec
+	un timestamp machine à chaque itération, et les données du grovepi si demandé. Les capteurs pris en compte sont :
+	- humidité de l'air et température (dht) : port D7
+	- Luminosité : A0 (témoin) et A2 (stressor)
+	- humidité du sol : A1
+
+	:param acquire_voltages: fonction `acquire_voltages(voltages)` propre à l'oscilloscope, qui écrit la moyenne
+		de chaque canal dans le tableau `voltages` (un canal non mesuré reste à NaN) et lève une exception si
+		l'acquisition échoue entièrement
+	:param int nb_channels: nombre de canaux mesurés par `acquire_voltages`
+	:param output_file: nom du fichier dans lequel il faut enregistrer les données
+	:param logger: Logger qui servira à logger les erreurs dans un fichier de logs
+	:param float duration: Durée en secondes pendant laquelle capturer les données. Si 0, capture indéfiniment jusqu'à ^C
+	:param boolean with_sensor_data: si true, capture les données du grovepi et les ajoute dans le CSV
+	:param max_fails: nombre maximal d'erreurs de lecture successives tolérées par capteur avant la levée d'une exception.
+		Pour l'oscilloscope, les échecs sont comptés par acquisition et par canal (canal resté à NaN)
+	:param boolean keep_data: si true, toutes les lignes sont conservées en mémoire et renvoyées ; sinon seul le bloc
+		en attente d'écriture est gardé
+	:param str file_format: "csv" (par défaut) ou "arrow" : flux Arrow IPC binaire, sans formatage texte des valeurs,
+		à convertir ensuite en CSV avec `utils/arrow2csv.py` (nécessite pyarrow)
+	:return: DataFrame contenant une colonne "timestamp" puis une colonne par canal et par capteur si `keep_data`, None sinon
+	:rtype: pandas.DataFrame
+	"""
+
+	# Échéance calculée une seule fois (horloge monotone, insensible aux recalages NTP) : infinie si duration vaut 0
+	deadline = float("inf") if duration == 0 else time.monotonic() + duration
+
+	number_of_iterations = 0
+	# Échecs successifs par capteur (indices FAIL_*), comparés en une fois aux seuils en fin d'itération
+	successive_io_fails = np.zeros(FAIL_CHANNELS + nb_channels, dtype=np.int32)
+	channel_fails = successive_io_fails[FAIL_CHANNELS:]  # Vue : compteurs par canal
+	max_successive_io_fails = np.full(len(successive_io_fails), max_fails, dtype=np.int32)
+	fail_names = FAIL_NAMES + tuple(f"scope channel {i+1}" for i in range(nb_channels))
+
+	# Thread dédié aux capteurs du grovepi, lus pendant l'acquisition de l'oscilloscope
+	executor = ThreadPoolExecutor(max_workers=1)
+	sensor_future = None
+
+	columns = [f"chan{i+1}_voltage_V" for i in range(nb_channels)] + (SENSOR_COLUMNS if with_sensor_data else [])
+	if file_format == "arrow":
+		import pyarrow as pa
+
+		# Flux Arrow IPC ajouté à la fin du fichier : une capture relancée y ajoute son propre flux
+		schema = pa.schema([("timestamp", pa.timestamp("us"))] + [(column, pa.float64()) for column in columns])
+		file = open(output_file, "ab")
+		stream = pa.ipc.new_stream(file, schema)
+		write_chunk = partial(_write_arrow_chunk, stream, file, logger, schema)
+	elif file_format == "csv":
+		# Fichier CSV ouvert une seule fois (tampon 64 Kio) : fermé, donc vidé, même sur ^C
+		file = open(output_file, "a", newline='', buffering=1 << 16)
+		# En-tête formaté une seule fois, à partir de la liste fixe des colonnes, et écrit dès l'ouverture
+		file.write(",".join(["timestamp", *columns]) + "\n")
+		stream = None
+		write_chunk = partial(_write_chunk, file, logger, columns)
+	else:
+		raise ValueError(f"Unknown capture file format: {file_format!r}")
+	# Écriture du fichier dans un thread dédié : la capture ne fait que déposer des blocs dans une file bornée
+	chunks = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+	writer_thread = threading.Thread(target=_drain, args=(chunks, write_chunk, logger), daemon=True)
+	writer_thread.start()
+	# Tampons colonne (SoA) : horodatages (ns, int64) d'un côté, une colonne float64 par grandeur de l'autre.
+	# Sans keep_data, un bloc de FLUSH_EVERY lignes suffit, réécrit après chaque écriture dans le CSV
+	capacity = INITIAL_CAPACITY if keep_data else FLUSH_EVERY
+	timestamps = np.empty(capacity, dtype=np.int64)
+	values = np.empty((capacity, len(columns)))
+	buffer_start = 0  # Itération stockée dans la première ligne des tampons
+	write_cursor = 0  # Première itération pas encore écrite dans le CSV
+	# Tampon des moyennes par canal, alloué une fois et remis à NaN à chaque itération
+	voltages = np.full(nb_channels, np.nan)
+	# Noms utilisés à chaque itération liés en variables locales (LOAD_FAST au lieu de LOAD_GLOBAL + LOAD_ATTR)
+	_monotonic, _time_ns, _nan, _isnan = time.monotonic, time.time_ns, np.nan, np.isnan
+	_fill_voltages, _submit, _put_chunk = voltages.fill, executor.submit, chunks.put
+	try:
+		while _monotonic() < deadline:
+			now = _time_ns()
+
+			_fill_voltages(_nan)
+			# Lecture des capteurs d'environnement en parallèle de l'acquisition
+			# Une lecture bloquée (I2C) n'est pas relancée tant qu'elle n'est pas revenue
+			if(with_sensor_data):
+				sensor_pending = sensor_future is not None and not sensor_future.done()
+				if not sensor_pending:
+					sensor_future = _submit(_read_all_sensors)
+
+			# Capture des échantillons de l'oscilloscope
+			try:
+				acquire_voltages(voltages)
+				successive_io_fails[FAIL_SCOPE] = 0
+
+			except Exception as e:
+				logger.warning("Acquisition failed in scope", exc_info=e)
+				successive_io_fails[FAIL_SCOPE] += 1
+
+			# Un canal resté à NaN a échoué : son compteur augmente, celui des autres revient à 0
+			channel_fails += 1
+			channel_fails *= _isnan(voltages)
+
+			# Capture des données des capteurs d'environnement
+			if(with_sensor_data):
+				# Lectures lancées avant l'acquisition de l'oscilloscope, récupérées ici (attente bornée).
+				# Lecture bloquée : les trois capteurs sont en échec pour cette itération (NaN, compteurs)
+				if sensor_pending:
+					dht_reading = light_reading = moisture_reading = FuturesTimeoutError("Grovepi sensors read still blocked, read skipped")
+				else:
+					try:
+						dht_reading, light_reading, moisture_reading = sensor_future.result(timeout=SENSOR_TIMEOUT)
+					except FuturesTimeoutError as e:
+						dht_reading = light_reading = moisture_reading = e
+
+				if isinstance(dht_reading, Exception):
+						e = dht_reading
+						logger.warning("Acquisition failed in dht sensor", exc_info=e)
+
+						successive_io_fails[FAIL_DHT] += 1
+						[ temp,hum ] = [_nan, _nan]
+				else:
+						[ temp,hum ] = dht_reading
+						successive_io_fails[FAIL_DHT] = 0
+
+				if isinstance(light_reading, Exception):
+						e = light_reading
+						logger.warning("Acquisition failed in light sensor", exc_info=e)
+						light_intensity_temoin, light_intensity_stressor = _nan, _nan
+						successive_io_fails[FAIL_LIGHT] += 1
+				else:
+						light_intensity_temoin, light_intensity_stressor = light_reading
+						successive_io_fails[FAIL_LIGHT] = 0
+
+				if isinstance(moisture_reading, Exception):
+						e = moisture_reading
+						logger.warning("Acquisition failed in moisture sensor", exc_info=e)
+						soil_moisture = _nan
+						successive_io_fails[FAIL_MOISTURE] += 1
+				else:
+						soil_moisture = moisture_reading
+						successive_io_fails[FAIL_MOISTURE] = 0
+
+			# Ligne courante dans les tampons colonne, doublés quand ils sont pleins (keep_data)
+			row = number_of_iterations - buffer_start
+			if row == len(timestamps):
+				timestamps, values = _grow(timestamps), _grow(values)
+			timestamps[row] = now
+			values[row, :nb_channels] = voltages
+			if(with_sensor_data):
+				values[row, nb_channels:] = (temp, hum, light_intensity_temoin, light_intensity_stressor, soil_moisture)
+
+			# Écriture par blocs : FLUSH_EVERY lignes, copiées (quelques Kio) car les tampons sont
+			# réutilisés, formatées d'un coup par pandas dans le thread d'écriture
+			if number_of_iterations + 1 - write_cursor == FLUSH_EVERY:
+				first = write_cursor - buffer_start
+				_put_chunk((timestamps[first:row + 1].copy(), values[first:row + 1].copy()))
+				write_cursor = number_of_iterations + 1
+				if not keep_data:
+					buffer_start = write_cursor
+
+			# on a fini la première itération
+			number_of_iterations = number_of_iterations + 1
+
+			# Une seule comparaison pour tous les compteurs ; la ligne courante est déjà enregistrée
+			too_many_fails = successive_io_fails > max_successive_io_fails
+			if too_many_fails.any():
+				failing = ", ".join(fail_names[i] for i in np.flatnonzero(too_many_fails))
+				raise Exception (f"Too many failed attempts on {failing} !")
+	finally:
+		# Dernier bloc, incomplet
+		if write_cursor < number_of_iterations:
+			first, last = write_cursor - buffer_start, number_of_iterations - buffer_start
+			chunks.put((timestamps[first:last].copy(), values[first:last].copy()))
+		# Sentinelle : le thread d'écriture vide la file puis s'arrête, avant la fermeture du fichier
+		chunks.put(None)
+		writer_thread.join()
+		if stream is not None:
+			stream.close()
+		file.close()
+		# Sans attendre une lecture des capteurs bloquée : la boucle de reconnexion reprend la main
+		executor.shutdown(wait=False, cancel_futures=True)
+
+	if not keep_data:
+		return None
+
+	# Tampon des valeurs ramené à la taille utile par réallocation en place (les lignes sont en tête,
+	# rien n'est recopié), pour que le DataFrame ne retienne pas la capacité inutilisée
+	try:
+		values.resize((number_of_iterations, len(columns)))
+	except ValueError:
+		values = values[:number_of_iterations]  # Tampon encore référencé ailleurs : simple vue
+
+	# Les tampons sont enveloppés sans copie (un seul bloc float64, l'horodatage dans un bloc à part)
+	df = pd.DataFrame(values, columns=columns, copy=False)
+	df.insert(0, "timestamp", _to_local_datetime64(timestamps[:number_of_iterations]))
+	return df
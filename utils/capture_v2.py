@@ -1,14 +1,35 @@
-from grovepi import *     
-import time
-from datetime import datetime as dt
-import pandas as pd
-import csv
+import numpy as np
+from numba import njit
+from concurrent.futures import ThreadPoolExecutor
 import dwfpy as dwf
+from utils.capture_core import capture
 
-def capture_with_timestamps(csv_file, logger, device1, device2, duration=0, with_sensor_data=False, max_fails=5):
+@njit(cache=True, nogil=True, fastmath=True)
+def _device_means(samples0, samples1, voltages):
+	"""
+	Moyennes des deux voies d'un oscilloscope en une seule passe compilée (vectorisée par LLVM) :
+	les deux voies sont parcourues côte à côte, chaque échantillon n'est lu qu'une fois et sans
+	copie préalable (contrairement à un `np.vstack(...).mean(axis=1)`). Le GIL est relâché : le
+	thread des capteurs du grovepi continue pendant ce temps.
+
+	:param numpy.ndarray samples0: échantillons de la voie 1 (float64 contigu)
+	:param numpy.ndarray samples1: échantillons de la voie 2, de même longueur
+	:param numpy.ndarray voltages: tampon de sortie des deux moyennes
+	"""
+	if samples1.size != samples0.size:
+		raise ValueError("Both channels of a record must have the same number of samples")
+	acc0 = 0.0
+	acc1 = 0.0
+	for j in range(samples0.size):
+		acc0 += samples0[j]
+		acc1 += samples1[j]
+	voltages[0] = acc0 / samples0.size
+	voltages[1] = acc1 / samples1.size
+
+def capture_with_timestamps(csv_file, logger, device1, device2, duration=0, with_sensor_data=False, max_fails=5, file_format="csv"):
 	"""
 	Capture les données d'un canal avec des timestamps machine à chaque seconde.
-	Capture également les données du grovepi. Les capteurs pris en compte sont : 
+	Capture également les données du grovepi. Les capteurs pris en compte sont :
 	- humidité de l'air et température (dht) : port D7
 	- Luminosité : A0
 	- humidité du sol : A2
@@ -20,20 +41,11 @@ def capture_with_timestamps(csv_file, logger, device1, device2, duration=0, with
 	:param float duration: Durée en secondes pendant laquelle capturer les données. Si 0, capture indéfiniment jusqu'à ^C
 	:param str channel: Le canal à capturer (par exemple, "CHAN1").
 	:param boolean with_sensor_data: si true, capture les données du grovepi et les ajoute dans le dataframe. Si false, les données du grovepi+ ne sont pas capturées
-	:param max_fails: nombre maximal d'erreurs de lecture tolérés avant la levée d'une exception
+	:param max_fails: nombre maximal d'erreurs de lecture successives tolérées avant la levée d'une exception,
+		par capteur et par voie (une voie d'un oscilloscope en échec compte même si l'autre oscilloscope répond)
+	:param str file_format: "csv" (par défaut) ou "arrow" pour un flux binaire Arrow IPC, converti ensuite avec `utils/arrow2csv.py`
     :return: None
 	"""
-	
-	start_time = time.time()  # Enregistre le temps de départ
-	
-	captured_data = []
-	
-	number_of_iterations = 0
-	successive_io_ds1054z_fails = 0
-	successive_io_dht_fails = 0
-	successive_io_light_sensor_fails = 0
-	successive_io_moisture_sensor_fails = 0
-
 
 	# Initialisation des oscilloscopes
 	scope1 = device1.analog_input
@@ -45,119 +57,31 @@ def capture_with_timestamps(csv_file, logger, device1, device2, duration=0, with
 	scope2[1].setup(range=0.020)
 	scope2.configure()
 
-	if (with_sensor_data):
-		# Configuration des capteurs d'environnement 
-		dht_sensor_port = 7 # connect the DHt sensor to port 7
-		dht_sensor_type = 0 # use 0 for the blue-colored sensor and 1 for the white-colored sensor
-		
-		light_sensor_port_temoin = 0
-		soil_moisture_sensor_port= 1
-		light_sensor_port_nolight = 2
-
-	nb_channels = 4 
-	
-
-	while time.time() - start_time < duration or duration == 0:
-		timestamp = dt.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-		
-		voltages = [pd.NA for _ in range(nb_channels)]
-
-		# Capture des échantillons pour le canal donné
-		try:
-			#record
-			recorder1 = scope1.record(sample_rate=1e6, length=0.5, configure=True, start=True)
-			recorder2 = scope2.record(sample_rate=1e6, length=0.5, configure=True, start=True)
+	# Un thread par oscilloscope : les deux acquisitions USB (bloquantes, GIL relâché) se recouvrent
+	with ThreadPoolExecutor(max_workers=2) as executor:
 
-			# retrieve info
-			samples_dev1_chan1 = recorder1.channels[0].data_samples
-			samples_dev1_chan2 = recorder1.channels[1].data_samples
-			voltages[0] = samples_dev1_chan1.mean()
-			voltages[1] = samples_dev1_chan2.mean()
-			
+		def acquire_voltages(voltages):
+			#record (les deux oscilloscopes en parallèle)
+			futures = (executor.submit(scope1.record, sample_rate=1e6, length=0.5, configure=True, start=True),
+					   executor.submit(scope2.record, sample_rate=1e6, length=0.5, configure=True, start=True))
 
-			samples_dev2_chan1 = recorder2.channels[0].data_samples
-			samples_dev2_chan2 = recorder2.channels[1].data_samples
-			voltages[2] = samples_dev2_chan1.mean()
-			voltages[3] = samples_dev2_chan2.mean()
-			
-			successive_io_ds1054z_fails = 0
-			
-		except Exception as e:
-			tb = e.__traceback__
-			logger.warning(f"Acquisition failed in scope, channel {channel_ind}")
-			logger.warning(e.with_traceback(tb))
-			successive_io_ds1054z_fails += 1
-			if successive_io_ds1054z_fails > max_fails * nb_channels:
-				raise Exception ("Too many failed attempts on ds1054z !")
-					
-			  
-		dict_to_append = {}
-		dict_to_append["timestamp"] = timestamp
-		for i in range (nb_channels) :
-				dict_to_append[f"chan{i+1}_voltage_V"] = voltages[i]
-		
-		# Capture des données des capteurs d'environnement
-		if(with_sensor_data): 
-			try:
-					[ temp,hum ] = dht(dht_sensor_port,dht_sensor_type)
-					
-					successive_io_dht_fails = 0
-			except Exception as e:
-					tb = e.__traceback__
-					logger.warning("Acquisition failed in dht sensor")
-					logger.warning(e.with_traceback(tb))
-					
-					successive_io_dht_fails += 1
-					[ temp,hum ] = [pd.NA, pd.NA]
-					if successive_io_dht_fails > max_fails:
-						raise Exception ("Too many failed attempts on dht sensor !")
-					
-			try:
-					light_intensity_temoin = analogRead(light_sensor_port_temoin)
-					light_intensity_stressor = analogRead(light_sensor_port_nolight)
-					successive_io_light_sensor_fails = 0
-			except Exception as e:
-					tb = e.__traceback__
-					logger.warning("Acquisition failed in light sensor")
-					logger.warning(e.with_traceback(tb))
-					light_intensity = pd.NA
-					successive_io_light_sensor_fails += 1
-					
-					if successive_io_light_sensor_fails > max_fails:
-						raise Exception ("Too many failed attempts on light sensor !")
-			try:
-					soil_moisture = analogRead(soil_moisture_sensor_port)
-					successive_io_moisture_sensor_fails = 0
-			except Exception as e:
-					tb = e.__traceback__
-					logger.warning("Acquisition failed in light sensor")
-					logger.warning(e.with_traceback(tb))
-					light_intensity = pd.NA
-					successive_io_moisture_sensor_fails += 1
-					
-					if successive_io_light_sensor_fails > max_fails:
-						raise Exception ("Too many failed attempts on light sensor !")
-						
-			dict_to_append["temp_degC"] = temp
-			dict_to_append["humidity_air_percent"] = hum
-			dict_to_append["light_intensity_baseline"] = light_intensity_temoin
-			dict_to_append["light_intensity_stressor"] = light_intensity_stressor
-			dict_to_append["soil_moisture"] = soil_moisture
+			# Chaque oscilloscope est traité à part : si l'un échoue, les voies de l'autre sont
+			# tout de même enregistrées. Les siennes restent à NaN et `capture` les compte en échec :
+			# un oscilloscope débranché finit par lever l'exception qui relance la connexion
+			failures = 0
+			for device_ind, future in enumerate(futures):
+				try:
+					recorder = future.result()
+					# retrieve info : chaque voie vue comme un tableau float64 contigu (pas de copie
+					# si dwfpy en fournit déjà un), moyennes calculées en code compilé
+					_device_means(np.ascontiguousarray(recorder.channels[0].data_samples, dtype=np.float64),
+								  np.ascontiguousarray(recorder.channels[1].data_samples, dtype=np.float64),
+								  voltages[2 * device_ind:2 * device_ind + 2])
+				except Exception as e:
+					logger.warning(f"Acquisition failed in dwfpy scope record, device {device_ind + 1}", exc_info=e)
+					failures += 1
+					last_error = e
+			if failures == len(futures):
+				raise Exception ("Acquisition failed in dwfpy scope record") from last_error
 
-		captured_data.append(dict_to_append)
-		
-		try:
-				with open(csv_file, "a", newline='') as file:
-						writer = csv.writer(file)
-						if (number_of_iterations == 0) :  # First iteration of loop, write column headers
-								writer.writerow(dict_to_append.keys())
-						writer.writerow(dict_to_append.values())
-						
-		except IOError as e: 
-				tb = e.__traceback__
-				logger.error(f"CSV write failed at timestamp {timestamp}" )
-				logger.error(e.with_traceback(tb))
-				
-		# on a fini la première itération
-		number_of_iterations = number_of_iterations + 1
-	
+		capture(acquire_voltages, 4, csv_file, logger, duration=duration, with_sensor_data=with_sensor_data, max_fails=max_fails, file_format=file_format)
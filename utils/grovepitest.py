@@ -1,6 +1,7 @@
 
 from grovepi import *
-from time import sleep
+import sys
+import time
 
 """
 Fichier permettant de tester le grovepi en isolation. 
@@ -16,25 +17,51 @@ dht_sensor_type = 0 # use 0 for the blue-colored sensor and 1 for the white-colo
 light_sensor_port = 0 
 soil_sensor_port = 2 
 
+PERIOD = 3.0  # Période de lecture des capteurs, en secondes
 
 
-# Programme
-while(1):
-	# get the temperature and Humidity from the DHT sensor
-	[ temp,hum ] = dht(dht_sensor_port,dht_sensor_type)
-	print("temp =", temp, "C\thumidity =", hum,"%")
+def benchmark_reads(n=100):
+	"""
+	Mesure la latence moyenne des lectures grovepi (aller-retour I2C), capteur par capteur,
+	pour savoir ce que la lecture en parallèle de l'oscilloscope permet de masquer.
 
+	:param int n: nombre de lectures par capteur
+	"""
+	reads = {
+		"dht": lambda: dht(dht_sensor_port, dht_sensor_type),
+		"light": lambda: analogRead(light_sensor_port),
+		"moisture": lambda: analogRead(soil_sensor_port),
+	}
+	for name, read in reads.items():
+		start = time.perf_counter()
+		for _ in range(n):
+			read()
+		print(f"{name} : {(time.perf_counter() - start) / n * 1000:.2f} ms par lecture ({n} lectures)")
 
-	# Get value from light sensor
-	light_intensity = analogRead(light_sensor_port)
 
-	# Get value from light sensor
-	moisture = analogRead(soil_sensor_port)
+# Programme : `python grovepitest.py bench` mesure les latences, sinon lecture en boucle
+if __name__ == "__main__" and sys.argv[1:] == ["bench"]:
+	benchmark_reads()
+elif __name__ == "__main__":
+	next_tick = time.monotonic()
+	while(1):
+		# get the temperature and Humidity from the DHT sensor
+		[ temp,hum ] = dht(dht_sensor_port,dht_sensor_type)
+		print("temp =", temp, "C\thumidity =", hum,"%")
 
 
-	print("light intensity : ", light_intensity)
+		# Get value from light sensor
+		light_intensity = analogRead(light_sensor_port)
 
-	print("moisture : ", moisture)
+		# Get value from light sensor
+		moisture = analogRead(soil_sensor_port)
 
-	sleep(3)
+
+		print("light intensity : ", light_intensity)
+
+		print("moisture : ", moisture)
+
+		# Échéance absolue sur l'horloge monotone : la durée des lectures ne décale pas la période
+		next_tick += PERIOD
+		time.sleep(max(0.0, next_tick - time.monotonic()))
 